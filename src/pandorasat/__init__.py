@@ -1,12 +1,12 @@
 # Standard library
 import configparser  # noqa: E402
+import importlib  # noqa: E402
 import logging  # noqa: E402
 import os  # noqa
 from glob import glob
 
 # Third-party
 import numpy as np  # noqa
-import pandas as pd  # noqa
 from appdirs import user_config_dir, user_data_dir  # noqa: E402
 from rich.console import Console  # noqa: E402
 from rich.logging import RichHandler  # noqa: E402
@@ -124,7 +124,10 @@ PHOENIXPATH = f"{CACHEDIR}/data/phoenix/"
 PHOENIXGRIDPATH = f"{CACHEDIR}/data/phoenix/grid/phoenix/phoenixm00/"
 
 
-def display_config() -> pd.DataFrame:
+def display_config():
+    # Third-party
+    import pandas as pd
+
     dfs = []
     for section in config.sections():
         df = pd.DataFrame(
@@ -139,18 +142,66 @@ def display_config() -> pd.DataFrame:
     return pd.concat(dfs)
 
 
-from .hardware import Hardware  # noqa: E402, F401
-from .irdetector import NIRDetector  # noqa: E402, F401
-from .orbit import Orbit  # noqa: E402, F401
-from .phoenix import SED  # noqa: E402, F401
-from .utils import *  # noqa: E402, F401, F403
-from .visibledetector import VisibleDetector  # noqa: E402, F401
+# Submodules and attributes that are only imported when they are first used.
+# This keeps `import pandorasat` fast, as the SED, catalog and plotting tools
+# import synphot, astroquery and matplotlib.
+_LAZY_ATTRIBUTES = {
+    "Hardware": "hardware",
+    "NIRDetector": "irdetector",
+    "Orbit": "orbit",
+    "SED": "phoenix",
+    "SED_batch": "phoenix",
+    "VisibleDetector": "visibledetector",
+    "get_sky_catalog": "catalog",
+    "get_sky_catalogs": "catalog",
+    "photon_energy": "utils",
+    "wavelength_to_rgb": "utils",
+    "animate": "plotting",
+    "save_gif": "plotting",
+    "save_mp4": "plotting",
+}
+_LAZY_SUBMODULES = [
+    "bundle",
+    "catalog",
+    "detectormixins",
+    "hardware",
+    "irdetector",
+    "orbit",
+    "phoenix",
+    "plotting",
+    "utils",
+    "visibledetector",
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(
+            f".{_LAZY_ATTRIBUTES[name]}", __name__
+        )
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(
+        list(globals().keys()) + list(_LAZY_ATTRIBUTES) + _LAZY_SUBMODULES
+    )
 
 
 class PandoraSat(object):
     """Holds information and methods for the full Pandora system."""
 
     def __init__(self):
+        from .hardware import Hardware
+        from .irdetector import NIRDetector
+        from .orbit import Orbit
+        from .visibledetector import VisibleDetector
+
         self.Orbit = Orbit()
         self.Hardware = Hardware()
         self.NIRDA = NIRDetector()
@@ -0,0 +1,186 @@
+"""Tools to move the PHOENIX data to machines with no internet access"""
+
+# Standard library
+import argparse
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from glob import glob
+
+from . import logger, phoenix
+
+__all__ = ["export_phoenix_bundle", "import_phoenix_bundle"]
+
+BUNDLE_MANIFEST = "bundle_manifest.json"
+
+
+def _bundle_files(include_grid=False):
+    """Returns the paths, relative to the PHOENIX directory, of files to bundle."""
+    phoenixpath = phoenix.PHOENIXPATH
+    fnames = [
+        os.path.relpath(fname, phoenixpath)
+        for fname in phoenix._phoenix_cube_paths()
+    ]
+    fnames += [
+        f"normalization_{band.replace(',', '_')}.npz"
+        for band in ["johnson,j", "johnson,v"]
+    ]
+    fnames += ["calspec/alpha_lyr_stis_011.fits"]
+    if include_grid:
+        fnames += [
+            os.path.relpath(fname, phoenixpath)
+            for fname in sorted(glob(f"{phoenix.PHOENIXGRIDPATH}*.fits"))
+            + sorted(glob(f"{phoenixpath}mtab/*_tm[cg].fits"))
+            + sorted(glob(f"{phoenixpath}comp/nonhst/johnson_*.fits"))
+        ]
+        fnames += ["grid/phoenix/catalog.fits"]
+    return fnames
+
+
+def export_phoenix_bundle(path, include_grid=False):
+    """
+    Exports the PHOENIX data this package reads as a single compressed archive.
+
+    By default the archive only holds the PHOENIX cube, the Johnson band
+    normalization and the Vega spectrum, which is all that is needed to make
+    SEDs. These are built first if they do not exist yet.
+
+    Parameters
+    ----------
+    path : str
+        Path of the `.tar.gz` archive to write.
+    include_grid : bool
+        Whether to also include the original PHOENIX grid files, and the
+        synphot throughput tables for the Johnson bands, so that `stsynphot`
+        can be used on the target machine.
+
+    Returns
+    -------
+    path : str
+        Path of the archive.
+    """
+    phoenix.load_phoenix_cube()
+    for band in ["johnson,j", "johnson,v"]:
+        phoenix._get_band_normalization(band)
+    phoenixpath = phoenix.PHOENIXPATH
+    fnames = _bundle_files(include_grid=include_grid)
+    manifest = {}
+    for fname in fnames:
+        fullname = os.path.join(phoenixpath, fname)
+        if not os.path.isfile(fullname):
+            raise ValueError(f"Can not find `{fullname}` to bundle.")
+        manifest[fname] = {
+            "size": os.path.getsize(fullname),
+            "sha256": phoenix._file_checksum(fullname),
+        }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manifest_path = os.path.join(tmpdir, BUNDLE_MANIFEST)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        with tarfile.open(path, "w:gz") as tar:
+            tar.add(manifest_path, arcname=BUNDLE_MANIFEST)
+            for fname in fnames:
+                tar.add(os.path.join(phoenixpath, fname), arcname=fname)
+    logger.info(f"Exported {len(fnames)} PHOENIX files to {path}.")
+    return path
+
+
+def import_phoenix_bundle(path):
+    """
+    Imports an archive made by `export_phoenix_bundle` into the cache directory.
+
+    Every file is checked against the checksums in the archive before any
+    file is moved into place.
+
+    Parameters
+    ----------
+    path : str
+        Path of the `.tar.gz` archive to import.
+    """
+    phoenixpath = phoenix.PHOENIXPATH
+    os.makedirs(phoenixpath, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=phoenixpath) as tmpdir:
+        with tarfile.open(path, "r:gz") as tar:
+            members = tar.getmembers()
+            fnames = set()
+            for member in members:
+                name = os.path.normpath(member.name)
+                if (
+                    not (member.isfile() or member.isdir())
+                    or os.path.isabs(name)
+                    or name.startswith("..")
+                ):
+                    raise ValueError(
+                        f"Unexpected file `{member.name}` in bundle."
+                    )
+                if member.isfile():
+                    fnames.add(name)
+            # The members are checked above, and the data filter makes the
+            # same checks where it is available
+            kwargs = (
+                {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+            )
+            tar.extractall(path=tmpdir, members=members, **kwargs)
+        manifest_path = os.path.join(tmpdir, BUNDLE_MANIFEST)
+        if not os.path.isfile(manifest_path):
+            raise ValueError(f"`{path}` is not a PHOENIX bundle.")
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        root = os.path.realpath(tmpdir)
+        for fname, entry in manifest.items():
+            fullname = os.path.join(tmpdir, fname)
+            # Only files that were checked on extraction are moved into place
+            if (
+                fname not in fnames
+                or fname == BUNDLE_MANIFEST
+                or os.path.commonpath([root, os.path.realpath(fullname)])
+                != root
+            ):
+                raise ValueError(f"Unexpected file `{fname}` in manifest.")
+            if (
+                not os.path.isfile(fullname)
+                or os.path.getsize(fullname) != entry["size"]
+                or phoenix._file_checksum(fullname) != entry["sha256"]
+            ):
+                raise ValueError(f"`{fname}` in bundle failed checksum.")
+        for fname in manifest:
+            destination = os.path.join(phoenixpath, fname)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.move(os.path.join(tmpdir, fname), destination)
+    phoenix._reset_caches()
+    if any(fname.startswith("grid/") for fname in manifest):
+        phoenix.write_phoenix_manifest()
+    logger.info(f"Imported {len(manifest)} PHOENIX files into {phoenixpath}.")
+
+
+def main(args=None):
+    """Command line interface to export and import PHOENIX bundles."""
+    parser = argparse.ArgumentParser(
+        prog="pandorasat-bundle",
+        description="Export or import the PHOENIX data used by pandorasat.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser(
+        "export", help="Write the PHOENIX data to an archive."
+    )
+    export_parser.add_argument("path", help="Archive to write.")
+    export_parser.add_argument(
+        "--include-grid",
+        action="store_true",
+        help="Include the full PHOENIX grid and synphot throughput tables.",
+    )
+    import_parser = subparsers.add_parser(
+        "import", help="Read the PHOENIX data from an archive."
+    )
+    import_parser.add_argument("path", help="Archive to read.")
+    args = parser.parse_args(args)
+    if args.command == "export":
+        export_phoenix_bundle(args.path, include_grid=args.include_grid)
+    else:
+        import_phoenix_bundle(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1571 @@
+"""Tools to query the Gaia catalog of stars around a pointing"""
+
+# Standard library
+import hashlib
+import json
+import os
+import threading
+import time as _time
+import warnings
+from functools import lru_cache
+
+# Third-party
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import Distance, SkyCoord
+from astropy.table import Table, vstack
+from astropy.time import Time
+
+from . import CACHEDIR, config, logger
+
+__all__ = [
+    "Catalog",
+    "CatalogBackend",
+    "GaiaBackend",
+    "FileBackend",
+    "get_catalog_backend",
+    "set_catalog_backend",
+    "get_sky_catalog",
+    "get_sky_catalogs",
+    "fetch_sky_catalogs",
+    "iter_sky_catalogs",
+    "query_gaia",
+    "query_gaia_fields",
+    "get_raw_catalog",
+    "get_raw_catalogs",
+    "get_tiled_catalog",
+    "sky_tiles",
+    "catalog_from_table",
+    "propagate_positions",
+    "evict_catalog_cache",
+    "clear_catalog_cache",
+]
+
+CATALOGPATH = f"{CACHEDIR}/data/catalogs/"
+
+# Columns queried from Gaia DR3 for every star
+BASE_KEYS = [
+    "source_id",
+    "ra",
+    "dec",
+    "parallax",
+    "pmra",
+    "pmdec",
+    "radial_velocity",
+    "ruwe",
+    "phot_bp_mean_mag",
+    "teff_gspphot",
+    "logg_gspphot",
+    "phot_g_mean_flux",
+    "phot_g_mean_mag",
+]
+
+# Reference epoch of the Gaia DR3 positions
+GAIA_REF_EPOCH = 2016.0
+
+# Change this when the query changes, so that old cached tables are not used
+QUERY_VERSION = 1
+
+
+def _to_degrees(value):
+    """Returns a float in degrees from a float or Quantity."""
+    return float(u.Quantity(value, u.deg).value)
+
+
+def _query_parameters(
+    ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys
+):
+    """Returns the query parameters as a dictionary of plain Python types."""
+    return {
+        "ra": _to_degrees(ra),
+        "dec": _to_degrees(dec),
+        "radius": _to_degrees(radius),
+        "epoch": float(epoch),
+        "gbpmagnitude_range": [float(mag) for mag in gbpmagnitude_range],
+        "limit": None if limit is None else int(limit),
+        "gaia_keys": list(gaia_keys),
+    }
+
+
+def query_gaia(
+    ra: float,
+    dec: float,
+    radius: float = 0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+) -> Table:
+    """
+    Queries the Gaia archive for stars around a position, crossmatched with 2MASS.
+
+    Positions are not propagated, so the table holds the Gaia DR3 positions
+    at the 2016 reference epoch.
+
+    Parameters
+    ----------
+    ra : float
+        Right Ascension of the center of the query radius in degrees.
+    dec : float
+        Declination of the center of the query radius in degrees.
+    radius : float
+        Radius centered on ra and dec that will be queried in degrees.
+    epoch: float
+        The epoch for your input RA and Dec. If not set, assumed to be 2000.
+    gbpmagnitude_range : tuple
+        Magnitude limits for the query.
+    limit : int
+        Maximum number of targets to return, closest to ra and dec first.
+    gaia_keys : tuple or list
+        Additional Gaia archive columns to query.
+
+    Returns
+    -------
+    tbl : astropy.table.Table
+        Table of results from the Gaia archive.
+    """
+    # Third-party
+    from astroquery import log as asqlog
+    from astroquery.gaia import Gaia
+
+    asqlog.setLevel("ERROR")
+
+    ra, dec, radius = _to_degrees(ra), _to_degrees(dec), _to_degrees(radius)
+    all_keys = BASE_KEYS + list(gaia_keys)
+
+    query_str = f"""
+    SELECT {f"TOP {limit} " if limit is not None else ""}* FROM (
+        SELECT gaia.{", gaia.".join(all_keys)}, dr2.teff_val AS dr2_teff_val,
+        dr2.rv_template_logg AS dr2_logg, tmass.j_m, tmass.j_msigcom, tmass.ph_qual, DISTANCE(
+        POINT({ra}, {dec}),
+        POINT(gaia.ra, gaia.dec)) AS ang_sep,
+        EPOCH_PROP_POS(gaia.ra, gaia.dec, gaia.parallax, gaia.pmra, gaia.pmdec,
+        gaia.radial_velocity, gaia.ref_epoch, {epoch}) AS propagated_position_vector
+        FROM gaiadr3.gaia_source AS gaia
+        JOIN gaiadr3.tmass_psc_xsc_best_neighbour AS xmatch USING (source_id)
+        JOIN gaiadr3.dr2_neighbourhood AS xmatch2 ON gaia.source_id = xmatch2.dr3_source_id
+        JOIN gaiadr2.gaia_source AS dr2 ON xmatch2.dr2_source_id = dr2.source_id
+        JOIN gaiadr3.tmass_psc_xsc_join AS xjoin USING (clean_tmass_psc_xsc_oid)
+        JOIN gaiadr1.tmass_original_valid AS tmass ON
+        xjoin.original_psc_source_id = tmass.designation
+        WHERE 1 = CONTAINS(
+        POINT({ra}, {dec}),
+        CIRCLE(gaia.ra, gaia.dec, {(radius * u.deg + 50 * u.arcsecond).to(u.deg).value}))
+        AND gaia.parallax IS NOT NULL
+        AND gaia.phot_bp_mean_mag > {gbpmagnitude_range[0]}
+        AND gaia.phot_bp_mean_mag < {gbpmagnitude_range[1]}) AS subquery
+    WHERE 1 = CONTAINS(
+    POINT({ra}, {dec}),
+    CIRCLE(COORD1(subquery.propagated_position_vector), COORD2(subquery.propagated_position_vector), {radius}))
+    ORDER BY ang_sep ASC
+    """
+    job = Gaia.launch_job_async(query_str, verbose=False)
+    tbl = job.get_results()
+    # The propagated position is only used to select stars in the query
+    if "propagated_position_vector" in tbl.colnames:
+        tbl.remove_column("propagated_position_vector")
+    return tbl
+
+
+def _catalog_cache_path(parameters):
+    """Returns the path of the cached table for a set of query parameters."""
+    key = json.dumps(
+        {"version": QUERY_VERSION, **parameters}, sort_keys=True
+    ).encode()
+    return f"{CATALOGPATH}{hashlib.sha256(key).hexdigest()}.parquet"
+
+
+def _catalog_cache_settings():
+    """Returns the maximum age in days, maximum size in MB and offline mode."""
+    settings = config["SETTINGS"]
+    return (
+        float(settings.get("catalog_cache_max_age", "30")),
+        float(settings.get("catalog_cache_max_size", "1000")),
+        settings.get("catalog_offline", "False").lower() == "true",
+    )
+
+
+def evict_catalog_cache(max_age=None, max_size=None):
+    """
+    Removes old tables from the catalog cache.
+
+    Tables older than `max_age` are removed first, then the least recently
+    used tables are removed until the cache is smaller than `max_size`.
+
+    Parameters
+    ----------
+    max_age : float
+        Maximum age of a cached table in days. Defaults to the
+        `catalog_cache_max_age` setting in the config file, or 30 days.
+    max_size : float
+        Maximum size of the catalog cache in MB. Defaults to the
+        `catalog_cache_max_size` setting in the config file, or 1000 MB.
+
+    Returns
+    -------
+    removed : int
+        Number of tables removed.
+    """
+    default_age, default_size, _ = _catalog_cache_settings()
+    max_age = default_age if max_age is None else max_age
+    max_size = default_size if max_size is None else max_size
+    try:
+        fnames = os.listdir(CATALOGPATH)
+    except FileNotFoundError:
+        return 0
+    entries = []
+    for fname in fnames:
+        if not fname.endswith(".parquet"):
+            continue
+        path = os.path.join(CATALOGPATH, fname)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Evicted by another thread or process
+            continue
+        entries.append((stat.st_atime, stat.st_mtime, stat.st_size, path))
+    now = _time.time()
+    keep, removed = [], 0
+    for entry in entries:
+        if now - entry[1] > max_age * 86400:
+            removed += _remove_cached_table(entry[3])
+        else:
+            keep.append(entry)
+    # Remove the least recently used tables first
+    keep.sort()
+    size = sum(entry[2] for entry in keep)
+    while keep and size > max_size * 2**20:
+        entry = keep.pop(0)
+        removed += _remove_cached_table(entry[3])
+        size -= entry[2]
+    return removed
+
+
+def _remove_cached_table(path):
+    """Removes a table from the cache, returning 1 if it was removed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Already evicted by another thread or process
+        return 0
+    return 1
+
+
+def clear_catalog_cache():
+    """Removes every table from the catalog cache, on disk and in memory."""
+    _get_tile.cache_clear()
+    _get_cached_catalog.cache_clear()
+    return evict_catalog_cache(max_age=-1)
+
+
+def _read_cached_table(parameters, offline=False):
+    """
+    Returns the cached table for a set of query parameters, or None.
+
+    If a query with a `limit` is not cached, the same query without a limit
+    is used instead, if it is cached.
+    """
+    max_age = _catalog_cache_settings()[0]
+    for limit in [parameters["limit"], None]:
+        path = _catalog_cache_path({**parameters, "limit": limit})
+        try:
+            mtime = os.path.getmtime(path)
+            if not (offline or (_time.time() - mtime <= max_age * 86400)):
+                continue
+            # Mark the table as recently used
+            os.utime(path, (_time.time(), mtime))
+            logger.debug(f"Reading cached catalog {path}")
+            tbl = Table.read(path, format="parquet")
+        except FileNotFoundError:
+            # Not cached, or evicted by another thread or process
+            continue
+        if limit != parameters["limit"]:
+            tbl = tbl[: parameters["limit"]]
+        return tbl
+    return None
+
+
+def _write_cached_table(parameters, tbl):
+    """Writes the table for a set of query parameters to the cache."""
+    path = _catalog_cache_path(parameters)
+    os.makedirs(CATALOGPATH, exist_ok=True)
+    tbl.meta = {"query": parameters}
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    tbl.write(tmp, format="parquet", overwrite=True)
+    os.replace(tmp, path)
+    evict_catalog_cache()
+
+
+def get_raw_catalog(
+    ra: float,
+    dec: float,
+    radius: float = 0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    offline=None,
+) -> Table:
+    """
+    Returns the Gaia table for a query, using a cache on disk.
+
+    Queries are answered by the current backend (see `get_catalog_backend`).
+    Tables from the Gaia archive are stored as Parquet files in the cache
+    directory, keyed on the query parameters, before any positions are
+    propagated. Tables older than the `catalog_cache_max_age` setting are
+    queried again. Local backends are not cached.
+
+    Parameters
+    ----------
+    ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys :
+        See `query_gaia`.
+    offline : bool
+        If True, only return tables from the cache, and raise a
+        `FileNotFoundError` if the query is not cached. Defaults to the
+        `catalog_offline` setting in the config file.
+
+    Returns
+    -------
+    tbl : astropy.table.Table
+        Table of results from the Gaia archive.
+    """
+    parameters = _query_parameters(
+        ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys
+    )
+    backend = get_catalog_backend()
+    if not backend.cache:
+        return backend.query(**parameters)
+    offline = _catalog_cache_settings()[2] if offline is None else offline
+    tbl = _read_cached_table(parameters, offline=offline)
+    if tbl is not None:
+        return tbl
+    if offline:
+        raise FileNotFoundError(
+            f"Catalog query is not cached, and `offline` is set: {parameters}"
+        )
+    logger.debug(f"Querying {backend}: {parameters}")
+    tbl = backend.query(**parameters)
+    _write_cached_table(parameters, tbl)
+    return tbl
+
+
+def query_gaia_fields(
+    ras,
+    decs,
+    radii,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    gaia_keys: tuple = (),
+) -> Table:
+    """
+    Queries the Gaia archive for stars around many positions in one job.
+
+    The field centers are uploaded to the archive as a table, and joined
+    against Gaia DR3, so that every field is found in a single query.
+
+    Parameters
+    ----------
+    ras : np.ndarray
+        Right Ascension of the center of each field in degrees.
+    decs : np.ndarray
+        Declination of the center of each field in degrees.
+    radii : np.ndarray
+        Radius of each field in degrees.
+    epoch, gbpmagnitude_range, gaia_keys :
+        See `query_gaia`.
+
+    Returns
+    -------
+    tbl : astropy.table.Table
+        Table of results from the Gaia archive, with a `field_id` column
+        giving the index of the field each row belongs to. Stars in more than
+        one field appear once per field.
+    """
+    # Third-party
+    from astroquery import log as asqlog
+    from astroquery.gaia import Gaia
+
+    asqlog.setLevel("ERROR")
+
+    fields = Table(
+        {
+            "field_id": np.arange(len(ras)),
+            "ra": np.asarray(ras, float),
+            "dec": np.asarray(decs, float),
+            "radius": np.asarray(radii, float),
+        }
+    )
+    all_keys = BASE_KEYS + list(gaia_keys)
+    query_str = f"""
+    SELECT * FROM (
+        SELECT fields.field_id, fields.ra AS field_ra, fields.dec AS field_dec,
+        fields.radius AS field_radius, gaia.{", gaia.".join(all_keys)}, dr2.teff_val AS dr2_teff_val,
+        dr2.rv_template_logg AS dr2_logg, tmass.j_m, tmass.j_msigcom, tmass.ph_qual, DISTANCE(
+        POINT(fields.ra, fields.dec),
+        POINT(gaia.ra, gaia.dec)) AS ang_sep,
+        EPOCH_PROP_POS(gaia.ra, gaia.dec, gaia.parallax, gaia.pmra, gaia.pmdec,
+        gaia.radial_velocity, gaia.ref_epoch, {epoch}) AS propagated_position_vector
+        FROM tap_upload.fields AS fields
+        JOIN gaiadr3.gaia_source AS gaia ON 1 = CONTAINS(
+        POINT(fields.ra, fields.dec),
+        CIRCLE(gaia.ra, gaia.dec, fields.radius + {(50 * u.arcsecond).to(u.deg).value}))
+        JOIN gaiadr3.tmass_psc_xsc_best_neighbour AS xmatch ON gaia.source_id = xmatch.source_id
+        JOIN gaiadr3.dr2_neighbourhood AS xmatch2 ON gaia.source_id = xmatch2.dr3_source_id
+        JOIN gaiadr2.gaia_source AS dr2 ON xmatch2.dr2_source_id = dr2.source_id
+        JOIN gaiadr3.tmass_psc_xsc_join AS xjoin ON xmatch.clean_tmass_psc_xsc_oid = xjoin.clean_tmass_psc_xsc_oid
+        JOIN gaiadr1.tmass_original_valid AS tmass ON
+        xjoin.original_psc_source_id = tmass.designation
+        WHERE gaia.parallax IS NOT NULL
+        AND gaia.phot_bp_mean_mag > {gbpmagnitude_range[0]}
+        AND gaia.phot_bp_mean_mag < {gbpmagnitude_range[1]}) AS subquery
+    WHERE 1 = CONTAINS(
+    POINT(subquery.field_ra, subquery.field_dec),
+    CIRCLE(COORD1(subquery.propagated_position_vector), COORD2(subquery.propagated_position_vector), subquery.field_radius))
+    ORDER BY field_id ASC, ang_sep ASC
+    """
+    job = Gaia.launch_job_async(
+        query_str,
+        upload_resource=fields,
+        upload_table_name="fields",
+        verbose=False,
+    )
+    tbl = job.get_results()
+    tbl.remove_columns(
+        [
+            key
+            for key in [
+                "field_ra",
+                "field_dec",
+                "field_radius",
+                "propagated_position_vector",
+            ]
+            if key in tbl.colnames
+        ]
+    )
+    return tbl
+
+
+class CatalogBackend:
+    """
+    Base class for the services that answer catalog queries.
+
+    A backend returns tables in the format of `query_gaia`, with positions at
+    the Gaia reference epoch. Subclasses implement `query`, and can override
+    `query_fields` if they can answer many fields at once. Set the backend
+    used by `get_sky_catalog` with `set_catalog_backend`.
+
+    Attributes
+    ----------
+    cache : bool
+        Whether results are stored in the catalog cache on disk.
+    """
+
+    cache = False
+
+    def query(
+        self,
+        ra,
+        dec,
+        radius,
+        epoch=2000,
+        gbpmagnitude_range=(-3, 20),
+        limit=None,
+        gaia_keys=(),
+    ) -> Table:
+        """Returns the stars in one field, see `query_gaia`."""
+        raise NotImplementedError
+
+    def query_fields(
+        self,
+        ras,
+        decs,
+        radii,
+        epoch=2000,
+        gbpmagnitude_range=(-3, 20),
+        gaia_keys=(),
+    ) -> Table:
+        """Returns the stars in many fields, see `query_gaia_fields`."""
+        tbls = []
+        for idx, (ra, dec, radius) in enumerate(zip(ras, decs, radii)):
+            tbl = self.query(
+                ra,
+                dec,
+                radius,
+                epoch=epoch,
+                gbpmagnitude_range=gbpmagnitude_range,
+                gaia_keys=gaia_keys,
+            )
+            tbl["field_id"] = np.full(len(tbl), idx)
+            tbls.append(tbl)
+        return vstack(tbls, metadata_conflicts="silent")
+
+
+class GaiaBackend(CatalogBackend):
+    """Queries the Gaia archive, see `query_gaia` and `query_gaia_fields`."""
+
+    cache = True
+
+    def __repr__(self):
+        return "GaiaBackend"
+
+    def query(self, ra, dec, radius, **kwargs) -> Table:
+        return query_gaia(ra, dec, radius, **kwargs)
+
+    def query_fields(self, ras, decs, radii, **kwargs) -> Table:
+        return query_gaia_fields(ras, decs, radii, **kwargs)
+
+
+class FileBackend(CatalogBackend):
+    """
+    Answers catalog queries from a local table of stars.
+
+    The table must be in the format returned by `query_gaia`, with positions
+    at the Gaia reference epoch, e.g. a Parquet file of an earlier query.
+    Queries select stars in the same way as the Gaia archive: stars are
+    propagated to `epoch`, cut to the cone and magnitude range, and sorted
+    by their separation from the center of the field.
+
+    Parameters
+    ----------
+    source : str or astropy.table.Table
+        Path to a table readable by `astropy.table.Table.read`, or a table.
+    """
+
+    def __init__(self, source):
+        tbl = source if isinstance(source, Table) else Table.read(source)
+        missing = [key for key in BASE_KEYS if key not in tbl.colnames]
+        if missing:
+            raise ValueError(f"Catalog table is missing columns {missing}.")
+        self.source = source if isinstance(source, str) else "Table"
+        # Sorting by declination lets a query look at one band of the table
+        tbl = tbl[np.argsort(_filled(tbl, "dec"))]
+        if "ang_sep" in tbl.colnames:
+            tbl.remove_column("ang_sep")
+        tbl.meta = {}
+        self.table = tbl
+        self._ra = _filled(tbl, "ra")
+        self._dec = _filled(tbl, "dec")
+        self._bpmag = _filled(tbl, "phot_bp_mean_mag")
+        self._has_parallax = ~np.ma.getmaskarray(tbl["parallax"])
+
+    def __repr__(self):
+        return f"FileBackend({self.source}, {len(self.table)} stars)"
+
+    def query(
+        self,
+        ra,
+        dec,
+        radius,
+        epoch=2000,
+        gbpmagnitude_range=(-3, 20),
+        limit=None,
+        gaia_keys=(),
+    ) -> Table:
+        ra, dec, radius = (
+            _to_degrees(ra),
+            _to_degrees(dec),
+            _to_degrees(radius),
+        )
+        missing = [key for key in gaia_keys if key not in self.table.colnames]
+        if missing:
+            raise ValueError(f"Catalog table is missing columns {missing}.")
+        # Stars can move by up to 50 arcseconds between epochs, as in Gaia
+        search = radius + 50 / 3600
+        start, stop = np.searchsorted(
+            self._dec, [dec - search, dec + search], side="left"
+        )
+        idx = np.arange(start, stop)
+        ang_sep = _angular_separation(ra, dec, self._ra[idx], self._dec[idx])
+        k = (
+            (ang_sep < search)
+            & self._has_parallax[idx]
+            & (self._bpmag[idx] > gbpmagnitude_range[0])
+            & (self._bpmag[idx] < gbpmagnitude_range[1])
+        )
+        idx, ang_sep = idx[k], ang_sep[k]
+        tbl = self.table[idx]
+        new_ra, new_dec = _propagate_table(tbl, [epoch])
+        k = _angular_separation(ra, dec, new_ra[0], new_dec[0]) < radius
+        order = np.argsort(ang_sep[k], kind="stable")[:limit]
+        tbl = tbl[np.where(k)[0][order]]
+        tbl["ang_sep"] = ang_sep[k][order]
+        return tbl
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_catalog_backend() -> CatalogBackend:
+    """
+    Returns the backend used to answer catalog queries.
+
+    Unless one is set with `set_catalog_backend`, this is set by the
+    `catalog_backend` setting in the config file, which is either "gaia"
+    (the default) or the path to a local table of stars (see `FileBackend`).
+    """
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            setting = config["SETTINGS"].get("catalog_backend", "gaia")
+            if setting.lower() == "gaia":
+                _BACKEND = GaiaBackend()
+            else:
+                _BACKEND = FileBackend(os.path.expanduser(setting))
+        return _BACKEND
+
+
+def set_catalog_backend(backend=None) -> CatalogBackend:
+    """
+    Sets the backend used to answer catalog queries.
+
+    Parameters
+    ----------
+    backend : CatalogBackend, str or None
+        Backend to use. A string is taken as "gaia" or the path to a local
+        table of stars. If None, the `catalog_backend` setting is used again.
+
+    Returns
+    -------
+    previous : CatalogBackend
+        The backend that was in use before, so that it can be restored.
+    """
+    global _BACKEND
+    previous = get_catalog_backend()
+    if isinstance(backend, str):
+        backend = (
+            GaiaBackend()
+            if backend.lower() == "gaia"
+            else FileBackend(backend)
+        )
+    elif backend is not None and not isinstance(backend, CatalogBackend):
+        raise TypeError(
+            "`backend` must be a CatalogBackend, a string or None."
+        )
+    with _BACKEND_LOCK:
+        _BACKEND = backend
+    # Results in memory may have come from the previous backend
+    _get_tile.cache_clear()
+    _get_cached_catalog.cache_clear()
+    return previous
+
+
+def get_raw_catalogs(
+    ras,
+    decs,
+    radii=0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    offline=None,
+    batch_size: int = 100,
+) -> list:
+    """
+    Returns the Gaia tables for many fields, querying missing fields together.
+
+    Fields that are in the cache are read from disk (see `get_raw_catalog`).
+    The rest are queried from the current backend (for the Gaia archive with
+    `query_gaia_fields`), `batch_size` fields per job, and each field is then
+    cached on its own.
+
+    Parameters
+    ----------
+    ras : np.ndarray
+        Right Ascension of the center of each field in degrees.
+    decs : np.ndarray
+        Declination of the center of each field in degrees.
+    radii : float or np.ndarray
+        Radius of each field in degrees.
+    epoch, gbpmagnitude_range, limit, gaia_keys :
+        See `query_gaia`. The same values are used for every field.
+    offline : bool
+        If True, only return tables from the cache. See `get_raw_catalog`.
+    batch_size : int
+        Maximum number of fields to query in one job.
+
+    Returns
+    -------
+    tbls : list of astropy.table.Table
+        Table of results from the Gaia archive for each field.
+    """
+    ras, decs, radii = np.broadcast_arrays(
+        np.atleast_1d(u.Quantity(ras, u.deg).value),
+        np.atleast_1d(u.Quantity(decs, u.deg).value),
+        np.atleast_1d(u.Quantity(radii, u.deg).value),
+    )
+    backend = get_catalog_backend()
+    offline = _catalog_cache_settings()[2] if offline is None else offline
+    offline = offline and backend.cache
+    parameters = [
+        _query_parameters(
+            ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys
+        )
+        for ra, dec, radius in zip(ras, decs, radii)
+    ]
+    tbls = [
+        _read_cached_table(p, offline=offline) if backend.cache else None
+        for p in parameters
+    ]
+    missing = [idx for idx, tbl in enumerate(tbls) if tbl is None]
+    if missing and offline:
+        raise FileNotFoundError(
+            f"{len(missing)} catalog queries are not cached, and `offline` is set."
+        )
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start : start + batch_size]
+        logger.debug(f"Querying {backend} for {len(batch)} fields")
+        result = backend.query_fields(
+            ras[batch],
+            decs[batch],
+            radii[batch],
+            epoch=epoch,
+            gbpmagnitude_range=gbpmagnitude_range,
+            gaia_keys=gaia_keys,
+        )
+        field_id = np.asarray(result["field_id"])
+        result.remove_column("field_id")
+        for jdx, idx in enumerate(batch):
+            tbl = result[field_id == jdx]
+            # Every field is cached without a limit, and the limit is applied
+            if backend.cache:
+                _write_cached_table({**parameters[idx], "limit": None}, tbl)
+            tbls[idx] = tbl[:limit]
+    return tbls
+
+
+def _angular_separation(ra1, dec1, ra2, dec2):
+    """Returns the angular separation in degrees between arrays of positions in degrees."""
+    ra1, dec1, ra2, dec2 = (np.deg2rad(x) for x in (ra1, dec1, ra2, dec2))
+    # Haversine formula, which is accurate at small separations
+    a = (
+        np.sin((dec2 - dec1) / 2) ** 2
+        + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    )
+    return np.rad2deg(2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))))
+
+
+# Proper motion of 1 au/yr at 1 pc in km/s, to convert radial velocities
+_AU_PER_YEAR_KMS = 4.740470446
+
+
+def _to_jyear(time):
+    """Returns times as decimal Julian years from a Time or array of years."""
+    if isinstance(time, Time):
+        return np.atleast_1d(time.jyear)
+    return np.atleast_1d(np.asarray(time, dtype=float))
+
+
+def propagate_positions(
+    ra,
+    dec,
+    pmra,
+    pmdec,
+    time,
+    parallax=None,
+    radial_velocity=None,
+    ref_epoch: float = GAIA_REF_EPOCH,
+    method: str = "rigorous",
+):
+    """
+    Propagates star positions to many times at once.
+
+    Parameters
+    ----------
+    ra : np.ndarray
+        Right Ascension of each star at `ref_epoch` in degrees.
+    dec : np.ndarray
+        Declination of each star at `ref_epoch` in degrees.
+    pmra : np.ndarray
+        Proper motion in RA, times cos(dec), in mas/yr.
+    pmdec : np.ndarray
+        Proper motion in Dec in mas/yr.
+    time : astropy.Time or np.ndarray
+        Times to propagate to, either as a Time or as decimal years.
+    parallax : np.ndarray
+        Parallax in mas. Only used by the rigorous method.
+    radial_velocity : np.ndarray
+        Radial velocity in km/s. Only used by the rigorous method.
+    ref_epoch : float
+        Epoch of the positions in decimal Julian years. Defaults to the Gaia
+        DR3 reference epoch.
+    method : str
+        Either "linear", which adds the proper motion to RA and Dec, or
+        "rigorous", which moves each star in a straight line in space,
+        including the change in proper motion from its radial velocity
+        (as in the Gaia DR3 documentation). Missing values are treated as 0.
+
+    Returns
+    -------
+    ra : np.ndarray
+        Right Ascension of each star at each time in degrees, with shape
+        (ntime, nstar).
+    dec : np.ndarray
+        Declination of each star at each time in degrees, with shape
+        (ntime, nstar).
+    """
+    ra, dec = np.atleast_1d(ra).astype(float), np.atleast_1d(dec).astype(float)
+    pmra = np.nan_to_num(np.atleast_1d(pmra).astype(float))
+    pmdec = np.nan_to_num(np.atleast_1d(pmdec).astype(float))
+    dt = (_to_jyear(time) - ref_epoch)[:, None]
+    if method == "linear":
+        new_dec = dec + pmdec * dt / 3.6e6
+        new_ra = ra + pmra * dt / 3.6e6 / np.cos(np.deg2rad(dec))
+        return new_ra % 360, new_dec
+    if method != "rigorous":
+        raise ValueError("`method` must be 'linear' or 'rigorous'.")
+
+    mas = np.deg2rad(1 / 3.6e6)
+    mur = np.zeros_like(ra)
+    if (parallax is not None) and (radial_velocity is not None):
+        plx = np.nan_to_num(np.atleast_1d(parallax).astype(float))
+        mur = np.nan_to_num(
+            np.atleast_1d(radial_velocity).astype(float)
+        ) * np.clip(plx, 0, None)
+        mur = mur / _AU_PER_YEAR_KMS * mas
+    sa, ca = np.sin(np.deg2rad(ra)), np.cos(np.deg2rad(ra))
+    sd, cd = np.sin(np.deg2rad(dec)), np.cos(np.deg2rad(dec))
+    pmra, pmdec = pmra * mas, pmdec * mas
+    # Unit vector to the star, and its proper motion vector, at ref_epoch
+    r = (cd * ca, cd * sa, sd)
+    mu = (
+        -sa * pmra - sd * ca * pmdec,
+        ca * pmra - sd * sa * pmdec,
+        cd * pmdec,
+    )
+    f = 1 / np.sqrt(1 + 2 * mur * dt + (pmra**2 + pmdec**2 + mur**2) * dt**2)
+    x, y, z = ((r[i] * (1 + mur * dt) + mu[i] * dt) * f for i in range(3))
+    new_ra = np.rad2deg(np.arctan2(y, x)) % 360
+    new_dec = np.rad2deg(np.arctan2(z, np.hypot(x, y)))
+    return new_ra, new_dec
+
+
+def _propagate_table(tbl, time, method="rigorous"):
+    """Returns the RA and Dec of stars in a Gaia table at `time`, see `propagate_positions`."""
+    return propagate_positions(
+        _filled(tbl, "ra"),
+        _filled(tbl, "dec"),
+        _filled(tbl, "pmra", 0),
+        _filled(tbl, "pmdec", 0),
+        time,
+        parallax=_filled(tbl, "parallax", 0),
+        radial_velocity=_filled(tbl, "radial_velocity", 0),
+        method=method,
+    )
+
+
+def _tile_bounds(tile_size, band, cell):
+    """Returns the RA and Dec bounds of a sky tile in degrees."""
+    dec0 = max(-90.0, -90 + band * tile_size)
+    dec1 = min(90.0, -90 + (band + 1) * tile_size)
+    ncells = _tile_cells(tile_size, band)
+    return (
+        cell * 360 / ncells,
+        (cell + 1) * 360 / ncells,
+        dec0,
+        dec1,
+    )
+
+
+def _tile_cells(tile_size, band):
+    """Returns the number of tiles in RA in a band of declination."""
+    dec = -90 + (band + 0.5) * tile_size
+    return max(1, int(np.floor(360 * np.cos(np.deg2rad(dec)) / tile_size)))
+
+
+def sky_tiles(ra, dec, radius, tile_size=0.5):
+    """
+    Returns the sky tiles that overlap a cone.
+
+    The sky is split into bands of declination `tile_size` wide, and each band
+    is split into tiles that are roughly `tile_size` wide in RA.
+
+    Parameters
+    ----------
+    ra : float
+        Right Ascension of the center of the cone in degrees.
+    dec : float
+        Declination of the center of the cone in degrees.
+    radius : float
+        Radius of the cone in degrees.
+    tile_size : float
+        Size of the tiles in degrees.
+
+    Returns
+    -------
+    tiles : list of tuple
+        The (band, cell) index of each tile.
+    """
+    ra, dec, radius = _to_degrees(ra), _to_degrees(dec), _to_degrees(radius)
+    nbands = int(np.ceil(180 / tile_size))
+    band0 = int(np.clip((dec - radius + 90) // tile_size, 0, nbands - 1))
+    band1 = int(np.clip((dec + radius + 90) // tile_size, 0, nbands - 1))
+    if radius >= 90 - abs(dec):
+        # The cone contains a pole
+        half_width = 180.0
+    else:
+        half_width = np.rad2deg(
+            np.arcsin(np.sin(np.deg2rad(radius)) / np.cos(np.deg2rad(dec)))
+        )
+    tiles = []
+    for band in range(band0, band1 + 1):
+        ncells = _tile_cells(tile_size, band)
+        width = 360 / ncells
+        if half_width >= 180:
+            cells = range(ncells)
+        else:
+            cells = np.arange(
+                np.floor((ra - half_width) / width),
+                np.floor((ra + half_width) / width) + 1,
+            ).astype(int)
+            cells = sorted(set(cells % ncells))
+        tiles.extend((band, int(cell)) for cell in cells)
+    return tiles
+
+
+@lru_cache(maxsize=256)
+def _get_tile(
+    tile_size, band, cell, gbpmagnitude_range, gaia_keys, offline=None
+):
+    """Returns the Gaia table of stars whose 2016 positions are in a sky tile.
+
+    Tiles are kept in memory, as overlapping fields read the same tiles.
+    """
+    ra0, ra1, dec0, dec1 = _tile_bounds(tile_size, band, cell)
+    ra, dec = (ra0 + ra1) / 2, (dec0 + dec1) / 2
+    # The farthest point of a tile from its center is always a corner
+    radius = _angular_separation(
+        ra, dec, np.asarray([ra0, ra0, ra1, ra1]), [dec0, dec1, dec0, dec1]
+    ).max()
+    tbl = get_raw_catalog(
+        ra=ra,
+        dec=dec,
+        radius=radius + 1 / 3600,
+        epoch=GAIA_REF_EPOCH,
+        gbpmagnitude_range=gbpmagnitude_range,
+        gaia_keys=gaia_keys,
+        offline=offline,
+    )
+    star_ra, star_dec = _filled(tbl, "ra") % 360, _filled(tbl, "dec")
+    k = (star_ra >= ra0) & (star_ra < ra1) & (star_dec >= dec0)
+    k &= (star_dec < dec1) | (dec1 == 90)
+    return tbl[k]
+
+
+def get_tiled_catalog(
+    ra: float,
+    dec: float,
+    radius: float = 0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    tile_size: float = 0.5,
+    offline=None,
+) -> Table:
+    """
+    Returns the Gaia table for a cone, made from cached sky tiles.
+
+    The Gaia archive is queried for whole tiles of the sky (see `sky_tiles`),
+    which are cached by `get_raw_catalog`. A cone is then cut from the tiles
+    it overlaps, so overlapping cones only query the tiles that are missing.
+    The result has the same columns as `get_raw_catalog`.
+
+    Stars are selected by their positions at `epoch`, which are found by
+    linear propagation of the Gaia proper motions.
+
+    Parameters
+    ----------
+    ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys :
+        See `query_gaia`.
+    tile_size : float
+        Size of the tiles in degrees.
+    offline : bool
+        If True, only use tiles in the cache. See `get_raw_catalog`.
+
+    Returns
+    -------
+    tbl : astropy.table.Table
+        Table of results from the Gaia archive.
+    """
+    # Third-party
+    from astropy.table import vstack
+
+    ra, dec, radius = _to_degrees(ra), _to_degrees(dec), _to_degrees(radius)
+    # Tiles hold stars by their 2016 positions, and stars can move by up to
+    # 50 arcseconds between epochs, as in `query_gaia`
+    tiles = sky_tiles(ra, dec, radius + 50 / 3600, tile_size=tile_size)
+    tbl = vstack(
+        [
+            _get_tile(
+                tile_size,
+                band,
+                cell,
+                tuple(gbpmagnitude_range),
+                tuple(gaia_keys),
+                offline=offline,
+            )
+            for band, cell in tiles
+        ],
+        metadata_conflicts="silent",
+    )
+    star_ra, star_dec = _propagate_table(tbl, epoch, method="linear")
+    tbl = tbl[_angular_separation(ra, dec, star_ra[0], star_dec[0]) < radius]
+    tbl["ang_sep"] = _angular_separation(
+        ra, dec, _filled(tbl, "ra"), _filled(tbl, "dec")
+    )
+    tbl.sort("ang_sep")
+    tbl.meta = {}
+    return tbl if limit is None else tbl[:limit]
+
+
+def _filled(tbl, key, fill_value=np.nan):
+    """Returns a column of the table as a plain array, with masked values filled."""
+    return np.ma.filled(np.ma.asarray(tbl[key]), fill_value)
+
+
+class Catalog:
+    """
+    Columnar catalog of stars, backed by a NumPy structured array.
+
+    Each star is a row of `data`. Positions are held at the Gaia reference
+    epoch, and can be propagated to any time with `positions`. Units are
+    held as metadata in `units`, and are attached when a column is read.
+
+    Reading a column, or slicing rows, returns a view of `data` without
+    copying. Boolean masks and index arrays return a new Catalog with a copy
+    of the selected rows.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Structured array with a field for each column.
+    units : dict
+        Unit of each column, if it has one.
+    ref_epoch : float
+        Epoch of the positions in decimal Julian years.
+    """
+
+    # Columns made from each Gaia table, their source, fill value and unit
+    COLUMNS = {
+        "source_id": ("source_id", 0, None),
+        "ra": ("ra", np.nan, u.deg),
+        "dec": ("dec", np.nan, u.deg),
+        "pmra": ("pmra", 0, u.mas / u.year),
+        "pmdec": ("pmdec", 0, u.mas / u.year),
+        "parallax": ("parallax", 0, u.mas),
+        "radial_velocity": ("radial_velocity", 0, u.km / u.s),
+        "jmag": ("j_m", np.nan, None),
+        "bmag": ("phot_bp_mean_mag", np.nan, None),
+        "gmag": ("phot_g_mean_mag", np.nan, None),
+        "gflux": ("phot_g_mean_flux", np.nan, u.electron / u.s),
+        "teff": ("teff_gspphot", np.nan, u.K),
+        "logg": ("logg_gspphot", np.nan, None),
+        "RUWE": ("ruwe", 99, None),
+        "ang_sep": ("ang_sep", np.nan, u.deg),
+    }
+
+    def __init__(self, data, units=None, ref_epoch=GAIA_REF_EPOCH):
+        self.data = data
+        self.units = {} if units is None else dict(units)
+        self.ref_epoch = ref_epoch
+
+    @classmethod
+    def from_table(cls, tbl, gaia_keys=()):
+        """
+        Makes a Catalog from a Gaia table, see `query_gaia`.
+
+        Parameters
+        ----------
+        tbl : astropy.table.Table
+            Table of results from the Gaia archive.
+        gaia_keys : tuple or list
+            Additional Gaia archive columns to include as columns.
+        """
+        columns = {
+            key: _filled(tbl, name, fill_value)
+            for key, (name, fill_value, _) in cls.COLUMNS.items()
+        }
+        columns["source_id"] = columns["source_id"].astype(np.int64)
+        columns["parallax"] = np.clip(columns["parallax"], 0, None)
+        # Fall back to Gaia DR2 values where DR3 has none
+        for key, dr2_key in [("teff", "dr2_teff_val"), ("logg", "dr2_logg")]:
+            missing = np.ma.getmaskarray(tbl[cls.COLUMNS[key][0]])
+            columns[key] = np.where(
+                missing, _filled(tbl, dr2_key), columns[key]
+            )
+        for key in gaia_keys:
+            columns[key] = _filled(tbl, key)
+        data = np.empty(
+            len(tbl),
+            dtype=[(key, value.dtype) for key, value in columns.items()],
+        )
+        for key, value in columns.items():
+            data[key] = value
+        units = {
+            key: unit
+            for key, (_, _, unit) in cls.COLUMNS.items()
+            if unit is not None
+        }
+        return cls(data, units=units)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"Catalog ({len(self)} stars)"
+
+    @property
+    def columns(self):
+        """Names of the columns"""
+        return list(self.data.dtype.names)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key in self.units:
+                return self.data[key] << self.units[key]
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 or None)
+        return Catalog(self.data[key], self.units, self.ref_epoch)
+
+    def cut_magnitude(self, key="jmag", brightest=-np.inf, faintest=np.inf):
+        """Returns the stars with magnitude `key` between `brightest` and `faintest`."""
+        mag = self.data[key]
+        return self[(mag >= brightest) & (mag <= faintest)]
+
+    def positions(self, time=None, method="rigorous"):
+        """
+        Returns the RA and Dec of every star at each time.
+
+        Parameters
+        ----------
+        time : astropy.Time or np.ndarray
+            Times as a Time or as decimal years. Defaults to the reference
+            epoch of the catalog.
+        method : str
+            Either "linear" or "rigorous", see `propagate_positions`.
+
+        Returns
+        -------
+        ra, dec : np.ndarray
+            RA and Dec in degrees, with shape (ntime, nstar).
+        """
+        return propagate_positions(
+            self.data["ra"],
+            self.data["dec"],
+            self.data["pmra"],
+            self.data["pmdec"],
+            self.ref_epoch if time is None else time,
+            parallax=self.data["parallax"],
+            radial_velocity=self.data["radial_velocity"],
+            ref_epoch=self.ref_epoch,
+            method=method,
+        )
+
+    def cut_cone(self, ra, dec, radius, time=None):
+        """Returns the stars within `radius` of a position at `time`, all in degrees."""
+        star_ra, star_dec = self.positions(time, method="linear")
+        sep = _angular_separation(
+            _to_degrees(ra), _to_degrees(dec), star_ra[0], star_dec[0]
+        )
+        return self[sep < _to_degrees(radius)]
+
+    def to_dict(self, time=None):
+        """
+        Returns the catalog as a dictionary, in the format of `get_sky_catalog`.
+
+        Parameters
+        ----------
+        time : astropy.Time object
+            Time at which to evaluate the positions of the stars. Defaults to
+            now.
+        """
+        if time is None:
+            time = Time.now()
+        cat = {
+            key: self.data[key]
+            for key in ["jmag", "bmag", "gmag", "gflux", "logg", "RUWE"]
+        }
+        cat["ang_sep"] = self["ang_sep"]
+        cat["teff"] = self["teff"]
+        star_ra, star_dec = self.positions(time)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cat["coords"] = SkyCoord(
+                ra=star_ra[0] * u.deg,
+                dec=star_dec[0] * u.deg,
+                pm_ra_cosdec=self["pmra"],
+                pm_dec=self["pmdec"],
+                obstime=time,
+                distance=Distance(
+                    parallax=self["parallax"], allow_negative=True
+                ),
+                radial_velocity=self["radial_velocity"],
+            )
+        cat["source_id"] = np.asarray(
+            [f"Gaia DR3 {i}" for i in self.data["source_id"]]
+        )
+        for key in self.columns:
+            if key not in self.COLUMNS:
+                cat[key] = self.data[key]
+        return cat
+
+    def write(self, path):
+        """Writes the catalog to a Parquet file, with its units and epoch."""
+        # Third-party
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        metadata = {
+            "units": {
+                key: unit.to_string() for key, unit in self.units.items()
+            },
+            "ref_epoch": self.ref_epoch,
+        }
+        table = pa.table(
+            {key: np.ascontiguousarray(self.data[key]) for key in self.columns}
+        ).replace_schema_metadata({"pandorasat": json.dumps(metadata)})
+        pq.write_table(table, path)
+
+    @classmethod
+    def read(cls, path):
+        """Reads a catalog written by `Catalog.write`."""
+        # Third-party
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        metadata = json.loads(table.schema.metadata[b"pandorasat"])
+        columns = {key: table[key].to_numpy() for key in table.column_names}
+        data = np.empty(
+            table.num_rows,
+            dtype=[(key, value.dtype) for key, value in columns.items()],
+        )
+        for key, value in columns.items():
+            data[key] = value
+        units = {key: u.Unit(unit) for key, unit in metadata["units"].items()}
+        return cls(data, units=units, ref_epoch=metadata["ref_epoch"])
+
+
+def catalog_from_table(tbl, gaia_keys=(), time=None) -> dict:
+    """
+    Converts a Gaia table into a catalog dictionary at a given time.
+
+    Parameters
+    ----------
+    tbl : astropy.table.Table
+        Table of results from the Gaia archive, see `query_gaia`.
+    gaia_keys : tuple or list
+        Additional Gaia archive columns to include in the output.
+    time : astropy.Time object
+        Time at which to evaluate the positions of the targets. Defaults to
+        now.
+
+    Returns
+    -------
+    cat : dict
+        Dictionary of values from the Gaia archive for each keyword.
+    """
+    if len(tbl) == 0:
+        raise ValueError("Could not find matches.")
+    return Catalog.from_table(tbl, gaia_keys=gaia_keys).to_dict(time=time)
+
+
+@lru_cache(maxsize=64)
+def _get_cached_catalog(
+    ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys, tiled
+):
+    """Returns the Gaia table for a query, keeping recent tables in memory.
+
+    All arguments must be hashable, and the returned table must not be
+    changed.
+    """
+    return (get_tiled_catalog if tiled else get_raw_catalog)(
+        ra=ra,
+        dec=dec,
+        radius=radius,
+        epoch=epoch,
+        gbpmagnitude_range=gbpmagnitude_range,
+        limit=limit,
+        gaia_keys=gaia_keys,
+    )
+
+
+def _get_table(
+    ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys, tiled
+):
+    """Returns the Gaia table for a query from `_get_cached_catalog`."""
+    parameters = _query_parameters(
+        ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys
+    )
+    parameters["gbpmagnitude_range"] = tuple(parameters["gbpmagnitude_range"])
+    parameters["gaia_keys"] = tuple(parameters["gaia_keys"])
+    return _get_cached_catalog(**parameters, tiled=tiled)
+
+
+def get_sky_catalog(
+    ra: float,
+    dec: float,
+    radius: float = 0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    time: Time = None,
+    tiled: bool = False,
+    as_catalog: bool = False,
+):
+    """
+    Gets a catalog of coordinates on the sky based on an input RA, Dec, and radius as well as
+    a magnitude range for Gaia. The user can also specify additional keywords to be grabbed
+    from Gaia catalog.
+
+    Gaia tables are cached before the positions are propagated, so the same
+    query at a different `time` does not query the Gaia archive again. The
+    most recent tables are kept in memory, and all tables are cached on disk
+    (see `get_raw_catalog`).
+
+    Parameters
+    ----------
+    ra : float
+        Right Ascension of the center of the query radius in degrees.
+    dec : float
+        Declination of the center of the query radius in degrees.
+    radius : float
+        Radius centered on ra and dec that will be queried in degrees.
+    epoch: float
+        The epoch for your input RA and Dec. If not set, assumed to be 2000.
+    gbpmagnitude_range : tuple
+        Magnitude limits for the query. Targets outside of this range will not be included in
+        the final output dictionary.
+    limit : int
+        Maximum number of targets from query that will be included in output dictionary. If a
+        limit is specified, targets will be included based on proximity to specified ra and dec.
+    gaia_keys : tuple or list
+        Additional Gaia archive columns to include in the final output dictionary.
+    time : astropy.Time object
+        Time at which to evaluate the positions of the targets in the output dictionary.
+        Defaults to the time of the call.
+    tiled : bool
+        Whether to make the catalog from cached sky tiles, which is faster
+        when querying many overlapping fields (see `get_tiled_catalog`).
+    as_catalog : bool
+        Whether to return a columnar `Catalog`, with positions at the Gaia
+        reference epoch, instead of a dictionary. `time` is not used.
+
+    Returns
+    -------
+    cat : dict or Catalog
+        Dictionary of values from the Gaia archive for each keyword.
+    """
+    tbl = _get_table(
+        ra, dec, radius, epoch, gbpmagnitude_range, limit, gaia_keys, tiled
+    )
+    if as_catalog:
+        return Catalog.from_table(tbl, gaia_keys=gaia_keys)
+    return catalog_from_table(tbl, gaia_keys=gaia_keys, time=time)
+
+
+def get_sky_catalogs(
+    ras,
+    decs,
+    radii=0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    time: Time = None,
+    batch_size: int = 100,
+    as_catalog: bool = False,
+) -> list:
+    """
+    Gets catalogs for many fields, querying the Gaia archive in as few jobs as possible.
+
+    This is the same as calling `get_sky_catalog` for each field, except
+    that all fields that are not cached are queried in one job (see
+    `get_raw_catalogs`), rather than one job per field.
+
+    Parameters
+    ----------
+    ras : np.ndarray
+        Right Ascension of the center of each field in degrees.
+    decs : np.ndarray
+        Declination of the center of each field in degrees.
+    radii : float or np.ndarray
+        Radius of each field in degrees.
+    epoch, gbpmagnitude_range, limit, gaia_keys, time :
+        See `get_sky_catalog`. The same values are used for every field.
+    batch_size : int
+        Maximum number of fields to query in one job.
+    as_catalog : bool
+        Whether to return a columnar `Catalog` for each field instead of a
+        dictionary. See `get_sky_catalog`.
+
+    Returns
+    -------
+    cats : list of dict or Catalog
+        Catalog dictionary for each field, or None for fields where no stars
+        were found. If `as_catalog` is set, a Catalog for each field, which
+        is empty if no stars were found.
+    """
+    if time is None:
+        time = Time.now()
+    tbls = get_raw_catalogs(
+        ras,
+        decs,
+        radii,
+        epoch=epoch,
+        gbpmagnitude_range=gbpmagnitude_range,
+        limit=limit,
+        gaia_keys=gaia_keys,
+        batch_size=batch_size,
+    )
+    if as_catalog:
+        return [Catalog.from_table(tbl, gaia_keys=gaia_keys) for tbl in tbls]
+    return [
+        (
+            catalog_from_table(tbl, gaia_keys=gaia_keys, time=time)
+            if len(tbl)
+            else None
+        )
+        for tbl in tbls
+    ]
+
+
+def _fetch_sky_catalog(args, kwargs, time, retries, backoff):
+    """Gets the catalog for one field, retrying failed queries with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            tbl = _get_table(*args, **kwargs)
+            break
+        except (FileNotFoundError, ValueError):
+            # Missing from the cache in offline mode, or a bad query
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise e
+            logger.debug(f"Retrying catalog query {args}: {e}")
+            _time.sleep(backoff * 2**attempt)
+    if len(tbl) == 0:
+        return None
+    return catalog_from_table(tbl, gaia_keys=kwargs["gaia_keys"], time=time)
+
+
+def fetch_sky_catalogs(
+    ras,
+    decs,
+    radii=0.155,
+    epoch: float = 2000,
+    gbpmagnitude_range: tuple = (-3, 20),
+    limit=None,
+    gaia_keys: tuple = (),
+    time: Time = None,
+    tiled: bool = False,
+    max_workers: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> list:
+    """
+    Starts fetching catalogs for many fields in the background.
+
+    Each field is fetched as by `get_sky_catalog`, on a pool of at most
+    `max_workers` threads, so that at most `max_workers` queries are sent to
+    the Gaia archive at once. The results can be used while the remaining
+    fields are being fetched, e.g. with `concurrent.futures.as_completed`,
+    or from `asyncio` with `asyncio.wrap_future`.
+
+    Parameters
+    ----------
+    ras : np.ndarray
+        Right Ascension of the center of each field in degrees.
+    decs : np.ndarray
+        Declination of the center of each field in degrees.
+    radii : float or np.ndarray
+        Radius of each field in degrees.
+    epoch, gbpmagnitude_range, limit, gaia_keys, time, tiled :
+        See `get_sky_catalog`. The same values are used for every field.
+    max_workers : int
+        Maximum number of fields to fetch at once.
+    retries : int
+        Number of times to retry a failed query.
+    backoff : float
+        Seconds to wait before the first retry. The wait doubles after each
+        failed attempt.
+
+    Returns
+    -------
+    futures : list of concurrent.futures.Future
+        Future for each field, whose result is the catalog dictionary, or
+        None if no stars were found.
+    """
+    # Standard library
+    from concurrent.futures import ThreadPoolExecutor
+
+    if time is None:
+        time = Time.now()
+    ras, decs, radii = np.broadcast_arrays(
+        np.atleast_1d(u.Quantity(ras, u.deg).value),
+        np.atleast_1d(u.Quantity(decs, u.deg).value),
+        np.atleast_1d(u.Quantity(radii, u.deg).value),
+    )
+    kwargs = {
+        "epoch": epoch,
+        "gbpmagnitude_range": gbpmagnitude_range,
+        "limit": limit,
+        "gaia_keys": gaia_keys,
+        "tiled": tiled,
+    }
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [
+        executor.submit(
+            _fetch_sky_catalog,
+            (ra, dec, radius),
+            kwargs,
+            time,
+            retries,
+            backoff,
+        )
+        for ra, dec, radius in zip(ras, decs, radii)
+    ]
+    # Queued fields still run, the pool's threads exit once they are done
+    executor.shutdown(wait=False)
+    return futures
+
+
+def iter_sky_catalogs(ras, decs, radii=0.155, timeout=None, **kwargs):
+    """
+    Fetches catalogs for many fields at once, yielding each one as it finishes.
+
+    Parameters
+    ----------
+    ras : np.ndarray
+        Right Ascension of the center of each field in degrees.
+    decs : np.ndarray
+        Declination of the center of each field in degrees.
+    radii : float or np.ndarray
+        Radius of each field in degrees.
+    timeout : float
+        Maximum number of seconds to wait for all the fields. If the time
+        runs out, `concurrent.futures.TimeoutError` is raised, and fields
+        that have not started are cancelled.
+    kwargs : dict
+        Keywords passed to `fetch_sky_catalogs`.
+
+    Yields
+    ------
+    index : int
+        Index of the field.
+    cat : dict
+        Catalog dictionary for the field, or None if no stars were found.
+    """
+    # Standard library
+    from concurrent.futures import as_completed
+
+    futures = fetch_sky_catalogs(ras, decs, radii, **kwargs)
+    index = {future: idx for idx, future in enumerate(futures)}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield index[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
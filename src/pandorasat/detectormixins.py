@@ -1,4 +1,5 @@
 # Standard library
+import functools
 import warnings
 
 # Third-party
@@ -8,7 +9,81 @@ import numpy as np
 __all__ = ["DetectorMixins"]
 
 
+def reference_property(func):
+    """
+    Property computed from the reference products, and stored on the instance.
+
+    The value is computed the first time it is read, and after that is read
+    from the instance. Stored values are cleared by `DetectorMixins.refresh`,
+    or if the `reference` attribute is replaced. Values are shared between
+    reads, so should not be changed in place.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self):
+        cache = self.__dict__.get("_reference_cache")
+        if cache is None or cache["reference"] is not self.reference:
+            cache = {"reference": self.reference}
+            self._reference_cache = cache
+        try:
+            return cache[name]
+        except KeyError:
+            value = cache[name] = func(self)
+            return value
+
+    return property(getter)
+
+
 class DetectorMixins:
+    def refresh(self):
+        """
+        Clears the values stored from the reference products.
+
+        Properties such as `zeropoint`, `bias` and `midpoint` are read from
+        the reference products once, and then stored. After a refresh they
+        are read again the next time they are used.
+        """
+        self.__dict__.pop("_reference_cache", None)
+
+    @reference_property
+    def _response_tables(self):
+        """
+        Tables of the detector response against wavelength.
+
+        The throughput, quantum efficiency and sensitivity are read from the
+        reference products once, on a fixed grid of `wavelength` in microns
+        that covers the reference data, and are then linearly interpolated.
+        All the tables are plain float64 arrays.
+        """
+        # Steps of 1e-5 micron are much finer than the reference data
+        wavelength = np.arange(10000, 350001) * 1e-5
+        tables = {"wavelength": wavelength}
+        for name in ["throughput", "qe", "sensitivity"]:
+            value = getattr(self.reference, f"get_{name}")(
+                wavelength=wavelength * u.micron
+            )
+            tables[name] = np.array(value.value, dtype=float)
+            tables[f"{name}_unit"] = value.unit
+        for table in tables.values():
+            if isinstance(table, np.ndarray):
+                table.flags.writeable = False
+        return tables
+
+    def _interpolate(self, name, wavelength):
+        """Returns a response table at wavelengths, as a Quantity or in microns."""
+        tables = self._response_tables
+        if not isinstance(wavelength, u.Quantity):
+            return np.interp(wavelength, tables["wavelength"], tables[name])
+        return u.Quantity(
+            np.interp(
+                wavelength.to_value(u.micron),
+                tables["wavelength"],
+                tables[name],
+            ),
+            tables[f"{name}_unit"],
+        )
+
     def qe(self, wavelength):
         """
         Calculate the quantum efficiency of the detector.
@@ -16,14 +91,16 @@ class DetectorMixins:
         Parameters
         ----------
         wavelength : npt.NDArray
-            Wavelength in microns as `astropy.unit`
+            Wavelength as an `astropy.units.Quantity`. If this is not a
+            Quantity it is taken to be in microns, and a plain float array is
+            returned, in electrons per photon.
 
         Returns
         -------
         qe : npt.NDArray
             Array of the quantum efficiency of the detector
         """
-        return self.reference.get_qe(wavelength=wavelength)
+        return self._interpolate("qe", wavelength)
 
     def sensitivity(self, wavelength):
         """
@@ -32,14 +109,16 @@ class DetectorMixins:
         Parameters
         ----------
         wavelength : npt.NDArray
-            Wavelength in microns as `astropy.unit`
+            Wavelength as an `astropy.units.Quantity`. If this is not a
+            Quantity it is taken to be in microns, and a plain float array is
+            returned, in cm2 electron / erg.
 
         Returns
         -------
         sensitivity : npt.NDArray
             Array of the sensitivity of the detector
         """
-        return self.reference.get_sensitivity(wavelength=wavelength)
+        return self._interpolate("sensitivity", wavelength)
 
     def throughput(self, wavelength):
         """
@@ -48,14 +127,91 @@ class DetectorMixins:
         Parameters
         ----------
         wavelength : npt.NDArray
-            Wavelength in microns as `astropy.unit`
+            Wavelength as an `astropy.units.Quantity`. If this is not a
+            Quantity it is taken to be in microns, and a plain float array is
+            returned.
 
         Returns
         -------
         sensitivity : npt.NDArray
             Array of the throughput of the detector
         """
-        return self.reference.get_throughput(wavelength=wavelength)
+        return self._interpolate("throughput", wavelength)
+
+    @reference_property
+    def _sed_weights_cache(self):
+        """Weights made by `_sed_weights`, for each wavelength grid."""
+        return {}
+
+    def _sed_weights(self, wavelength):
+        """
+        Returns the weights that integrate spectra through the bandpass.
+
+        The weights are the trapezoid rule weights on the wavelength grid in
+        microns, times the sensitivity, so that the dot product with a
+        spectrum in erg / s / cm2 / Angstrom gives electrons per second.
+        """
+        cache = self._sed_weights_cache
+        key = wavelength.tobytes()
+        if key not in cache:
+            if len(wavelength) < 2 or np.any(np.diff(wavelength) <= 0):
+                raise ValueError("`wavelength` must be increasing.")
+            step = np.diff(wavelength)
+            trapezoid = np.zeros(len(wavelength))
+            trapezoid[:-1] += step / 2
+            trapezoid[1:] += step / 2
+            unit = (
+                self._response_tables["sensitivity_unit"]
+                * u.micron
+                * u.erg
+                / u.s
+                / u.cm**2
+                / u.AA
+            )
+            weights = (
+                self.sensitivity(wavelength)
+                * trapezoid
+                * unit.to(u.electron / u.second)
+            )
+            weights.flags.writeable = False
+            if len(cache) >= 16:
+                cache.pop(next(iter(cache)))
+            cache[key] = weights
+        return cache[key]
+
+    def integrate_sed(self, wavelength, flux):
+        """
+        Integrates spectra through the bandpass of the detector.
+
+        The integral is done as one matrix-vector product of the spectra with
+        a vector of weights, which is only made once for each wavelength
+        grid. This gives the count rate on the detector for a whole catalog
+        of stars in one call.
+
+        Parameters
+        ----------
+        wavelength : npt.NDArray
+            Increasing wavelengths of the spectra, as an
+            `astropy.units.Quantity`, or in microns.
+        flux : npt.NDArray
+            Spectra with shape (nwave,) or (nstar, nwave), as an
+            `astropy.units.Quantity`, or in erg / s / cm2 / Angstrom.
+
+        Returns
+        -------
+        flux : npt.NDArray
+            Band integrated flux of each spectrum in electrons per second.
+            This is a Quantity if `flux` is a Quantity, and a plain float
+            array otherwise.
+        """
+        if isinstance(wavelength, u.Quantity):
+            wavelength = wavelength.to_value(u.micron)
+        wavelength = np.ascontiguousarray(wavelength, dtype=float)
+        weights = self._sed_weights(wavelength)
+        if isinstance(flux, u.Quantity):
+            flux = flux.to_value(u.erg / u.s / u.cm**2 / u.AA)
+            return (np.asarray(flux) @ weights) * (u.electron / u.second)
+        return np.asarray(flux, dtype=float) @ weights
 
     def estimate_zeropoint(self):
         """
@@ -69,24 +225,24 @@ class DetectorMixins:
         )
         return self.zeropoint
 
-    @property
+    @reference_property
     def zeropoint(self):
         """
         Calulate the zeropoint of the detector.
         """
         return self.reference.get_zeropoint()
 
-    @property
+    @reference_property
     def dark(self):
         """Dark Noise"""
         return self.reference.get_dark()
 
-    @property
+    @reference_property
     def readnoise(self):
         """Read Noise"""
         return self.reference.get_readnoise()
 
-    @property
+    @reference_property
     def gain(self):
         """Gain"""
         return self.reference.get_gain()
@@ -100,7 +256,7 @@ class DetectorMixins:
         if values.unit == u.DN:
             return values * self.gain
 
-    @property
+    @reference_property
     def bias(self):
         """Gain"""
         return self.reference.get_bias()
@@ -130,12 +286,366 @@ class DetectorMixins:
         wcs: astropy.wcs.WCS
             World Coordinate System object
         """
-        return self.reference.get_wcs(
-            target_ra=u.Quantity(ra, "deg"),
-            target_dec=u.Quantity(dec, "deg"),
-            theta=u.Quantity(theta, "deg"),
-            distortion=distortion,
+        # Only CRVAL and PC change, so the rest is copied from a stored WCS
+        wcs = self._base_wcs(distortion=distortion).deepcopy()
+        theta = np.deg2rad(u.Quantity(theta, "deg").value)
+        wcs.wcs.crval = [
+            u.Quantity(ra, "deg").value,
+            u.Quantity(dec, "deg").value,
+        ]
+        wcs.wcs.pc = [
+            [np.cos(theta), -np.sin(theta)],
+            [np.sin(theta), np.cos(theta)],
+        ]
+        wcs.wcs.set()
+        return wcs
+
+    @reference_property
+    def _base_wcs_cache(self):
+        """WCS made by `_base_wcs`, for each value of `distortion`."""
+        return {}
+
+    def _base_wcs(self, distortion=True):
+        """
+        Returns the WCS from the reference products, pointed at (0, 0).
+
+        This is made once for each value of `distortion`, and is shared, so
+        must not be changed.
+        """
+        cache = self._base_wcs_cache
+        distortion = bool(distortion)
+        if distortion not in cache:
+            cache[distortion] = self.reference.get_wcs(
+                target_ra=0 * u.deg,
+                target_dec=0 * u.deg,
+                theta=0 * u.deg,
+                distortion=distortion,
+            )
+        return cache[distortion]
+
+    def _projection_parameters(self, distortion=True):
+        """Returns the reference pixel, pixel scale and SIP of the detector WCS.
+
+        Only CRVAL and PC depend on the pointing, so these are the same for
+        every pointing.
+        """
+        wcs = self._base_wcs(distortion=distortion)
+        sip = wcs.sip if distortion else None
+        return wcs.wcs.crpix, wcs.wcs.cdelt, sip
+
+    def world_to_pixel(self, coords, ra, dec, theta=0, distortion=True):
+        """
+        Finds the pixel positions of sky coordinates for many pointings.
+
+        This gives the same result as calling `get_wcs` for each pointing,
+        and then `world_to_pixel` on the WCS. It does not build a WCS for
+        each pointing, and does all the pointings at once.
+
+        Parameters
+        ----------
+        coords : astropy.coordinates.SkyCoord
+            Sky coordinates to find the pixel positions of.
+        ra : float or np.ndarray
+            RA of each pointing in degrees.
+        dec : float or np.ndarray
+            Dec of each pointing in degrees.
+        theta : float or np.ndarray
+            Observatory angle of each pointing in degrees.
+        distortion : bool
+            Whether to apply the SIP distortion.
+
+        Returns
+        -------
+        x : np.ndarray
+            0-indexed column position, as in `astropy.wcs.WCS.world_to_pixel`.
+            The shape is the shape of the pointings followed by the shape of
+            `coords`.
+        y : np.ndarray
+            0-indexed row position, with the same shape as `x`.
+        """
+        coords = coords.icrs
+        ra, dec, theta = np.broadcast_arrays(
+            u.Quantity(ra, "deg").value,
+            u.Quantity(dec, "deg").value,
+            u.Quantity(theta, "deg").value,
+        )
+        expand = (Ellipsis,) + (None,) * coords.ndim
+        row, column = self._world_to_pixel(
+            coords.ra.deg,
+            coords.dec.deg,
+            ra[expand],
+            dec[expand],
+            theta[expand],
+            self._projection_parameters(distortion=distortion),
         )
+        return column, row
+
+    def _world_to_pixel(
+        self, ra, dec, pointing_ra, pointing_dec, theta, parameters
+    ):
+        """
+        Returns the pixel position of stars for pointings, as the detector WCS.
+
+        All the inputs are arrays in degrees that broadcast together. Pixels
+        are 0-indexed (row, column). Stars more than 90 degrees from the
+        pointing are NaN.
+        """
+        crpix, cdelt, sip = parameters
+        ra, dec, pointing_ra, pointing_dec, theta = (
+            np.deg2rad(np.asarray(x, dtype=float))
+            for x in np.broadcast_arrays(
+                ra, dec, pointing_ra, pointing_dec, theta
+            )
+        )
+        # Gnomonic (TAN) projection onto the plane tangent at the pointing
+        dra = ra - pointing_ra
+        cos_dec, sin_dec = np.cos(dec), np.sin(dec)
+        cos_dra = np.cos(dra)
+        cos_sep = (
+            np.sin(pointing_dec) * sin_dec
+            + np.cos(pointing_dec) * cos_dec * cos_dra
+        )
+        cos_sep = np.where(cos_sep > 0, cos_sep, np.nan)
+        x = np.rad2deg(cos_dec * np.sin(dra) / cos_sep) / cdelt[0]
+        y = (
+            np.rad2deg(
+                (
+                    np.cos(pointing_dec) * sin_dec
+                    - np.sin(pointing_dec) * cos_dec * cos_dra
+                )
+                / cos_sep
+            )
+            / cdelt[1]
+        )
+        # Undo the rotation in the PC matrix
+        cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+        u0 = cos_theta * x + sin_theta * y
+        v0 = cos_theta * y - sin_theta * x
+        if sip is None:
+            return v0 + crpix[1] - 1, u0 + crpix[0] - 1
+        # Invert the SIP distortion, starting from the inverse polynomial
+        u0, v0 = u0.ravel(), v0.ravel()
+        u, v = u0.copy(), v0.copy()
+        if sip.ap is not None:
+            u += _sip_polynomial(sip.ap, u0, v0)
+            v += _sip_polynomial(sip.bp, u0, v0)
+        # Only points that have not converged are iterated again
+        active = np.flatnonzero(np.isfinite(u) & np.isfinite(v))
+        for _ in range(20):
+            if len(active) == 0:
+                break
+            ua, va = u[active], v[active]
+            u[active] = u0[active] - _sip_polynomial(sip.a, ua, va)
+            v[active] = v0[active] - _sip_polynomial(sip.b, ua, va)
+            change = np.maximum(np.abs(u[active] - ua), np.abs(v[active] - va))
+            active = active[change > 1e-6]
+        u, v = u.reshape(x.shape), v.reshape(x.shape)
+        return v + sip.crpix[1] - 1, u + sip.crpix[0] - 1
+
+    def _footprint_cone(self, lower, upper, ra, dec, theta, distortion=True):
+        """
+        Returns a cone around a footprint of the detector for each pointing.
+
+        Parameters
+        ----------
+        lower, upper : np.ndarray
+            Lower and upper (row, column) edges of the footprint in pixels.
+        ra, dec, theta : np.ndarray
+            Pointings in degrees.
+
+        Returns
+        -------
+        center_ra, center_dec : np.ndarray
+            Center of the footprint for each pointing in degrees.
+        radius : float
+            Radius of the cone in degrees, which covers the footprint.
+        """
+        # First-party/Local
+        from pandorasat.catalog import _angular_separation
+
+        # Separations between points in the plane of the detector are the
+        # same for every pointing, so the radius is found at (0, 0, 0)
+        center = (lower + upper) / 2
+        edge = np.linspace(0, 1, 33)
+        edge_row = np.hstack(
+            [lower[0] + (upper[0] - lower[0]) * edge] * 2
+            + [np.full(33, lower[0]), np.full(33, upper[0])]
+        )
+        edge_column = np.hstack(
+            [np.full(33, lower[1]), np.full(33, upper[1])]
+            + [lower[1] + (upper[1] - lower[1]) * edge] * 2
+        )
+        wcs = self._base_wcs(distortion=distortion)
+        world = wcs.pixel_to_world(
+            np.hstack([center[1], edge_column]),
+            np.hstack([center[0], edge_row]),
+        )
+        center_ra0 = np.deg2rad(world.ra.deg[0])
+        center_dec0 = np.deg2rad(world.dec.deg[0])
+        radius = 1.01 * np.max(
+            _angular_separation(
+                world.ra.deg[0], world.dec.deg[0], world.ra.deg, world.dec.deg
+            )
+        )
+        # Offset of the center from the reference pixel, rotated by the PC
+        # matrix of each pointing, and projected back onto the sky
+        cdelt = wcs.wcs.cdelt
+        qx = np.rad2deg(np.tan(center_ra0)) / cdelt[0]
+        qy = np.rad2deg(np.tan(center_dec0) / np.cos(center_ra0)) / cdelt[1]
+        theta = np.deg2rad(theta)
+        xi = np.deg2rad(cdelt[0] * (np.cos(theta) * qx - np.sin(theta) * qy))
+        eta = np.deg2rad(cdelt[1] * (np.sin(theta) * qx + np.cos(theta) * qy))
+        dec = np.deg2rad(dec)
+        denom = np.cos(dec) - eta * np.sin(dec)
+        center_ra = (ra + np.rad2deg(np.arctan2(xi, denom))) % 360
+        center_dec = np.rad2deg(
+            np.arctan2(np.sin(dec) + eta * np.cos(dec), np.hypot(xi, denom))
+        )
+        return center_ra, center_dec, radius
+
+    def project_catalog(
+        self,
+        catalog,
+        ra,
+        dec,
+        theta=0,
+        time=None,
+        distortion=True,
+        subarray=False,
+        pad=0,
+    ):
+        """
+        Finds the pixel position of every star in a catalog for many pointings.
+
+        This uses the same projection as `get_wcs`, but for all the pointings
+        at once. Stars that are too far from a pointing to land on the
+        detector are cut before they are projected.
+
+        Parameters
+        ----------
+        catalog : pandorasat.catalog.Catalog or astropy.coordinates.SkyCoord
+            Stars to project.
+        ra : float or np.ndarray
+            RA of each pointing in degrees.
+        dec : float or np.ndarray
+            Dec of each pointing in degrees.
+        theta : float or np.ndarray
+            Observatory angle of each pointing in degrees.
+        time : astropy.time.Time
+            Time to propagate the catalog positions to. Only used for a
+            Catalog. If None, positions at the catalog epoch are used.
+        distortion : bool
+            Whether to apply the SIP distortion.
+        subarray : bool
+            If True, only keep stars on the subarray for nominal operations,
+            and give positions relative to its corner.
+        pad : float
+            Keep stars up to this many pixels outside the footprint.
+
+        Returns
+        -------
+        pointing_idx : np.ndarray
+            Index of the pointing for each star that lands on the footprint.
+        star_idx : np.ndarray
+            Index in the catalog of each star that lands on the footprint.
+        row : np.ndarray
+            0-indexed row position of each star.
+        column : np.ndarray
+            0-indexed column position of each star.
+        """
+        # First-party/Local
+        from pandorasat.catalog import Catalog, _angular_separation
+
+        if isinstance(catalog, Catalog):
+            if time is None:
+                star_ra, star_dec = catalog.data["ra"], catalog.data["dec"]
+            else:
+                star_ra, star_dec = (x[0] for x in catalog.positions(time))
+        else:
+            star_ra, star_dec = catalog.icrs.ra.deg, catalog.icrs.dec.deg
+        star_ra = np.atleast_1d(np.asarray(star_ra, dtype=float))
+        star_dec = np.atleast_1d(np.asarray(star_dec, dtype=float))
+        ra, dec, theta = (
+            np.atleast_1d(x).ravel()
+            for x in np.broadcast_arrays(
+                u.Quantity(ra, "deg").value,
+                u.Quantity(dec, "deg").value,
+                u.Quantity(theta, "deg").value,
+            )
+        )
+
+        if subarray:
+            if not hasattr(self, "subarray_corner"):
+                raise ValueError(f"{self.name} has no subarray.")
+            corner, shape = self.subarray_corner, self.subarray_size
+        else:
+            corner, shape = (0, 0), self.shape
+        lower = np.asarray(corner) - 0.5 - pad
+        upper = np.asarray(corner) + np.asarray(shape) - 0.5 + pad
+
+        # Stars that are further from the center of the footprint than any
+        # edge are cut before they are projected
+        center_ra, center_dec, max_sep = self._footprint_cone(
+            lower, upper, ra, dec, theta, distortion=distortion
+        )
+        parameters = self._projection_parameters(distortion=distortion)
+
+        results = []
+        # Work on a block of pointings at a time, to limit memory use
+        nblock = max(1, 2**22 // max(len(star_ra), 1))
+        for start in range(0, len(ra), nblock):
+            block = slice(start, start + nblock)
+            sep = _angular_separation(
+                center_ra[block, None],
+                center_dec[block, None],
+                star_ra,
+                star_dec,
+            )
+            pointing_idx, star_idx = np.nonzero(sep < max_sep)
+            pointing_idx += start
+            row, column = self._world_to_pixel(
+                star_ra[star_idx],
+                star_dec[star_idx],
+                ra[pointing_idx],
+                dec[pointing_idx],
+                theta[pointing_idx],
+                parameters,
+            )
+            k = (
+                (row >= lower[0])
+                & (row < upper[0])
+                & (column >= lower[1])
+                & (column < upper[1])
+            )
+            results.append(
+                (
+                    pointing_idx[k],
+                    star_idx[k],
+                    row[k] - corner[0],
+                    column[k] - corner[1],
+                )
+            )
+        if not results:
+            return (
+                np.zeros(0, int),
+                np.zeros(0, int),
+                np.zeros(0),
+                np.zeros(0),
+            )
+        return tuple(np.hstack(x) for x in zip(*results))
+
+    @reference_property
+    def _photometric_calibration(self):
+        """
+        Zeropoint, and the integral of the sensitivity over wavelength times
+        the zeropoint.
+
+        These convert between magnitudes, average flux density and band
+        integrated flux.
+        """
+        wavelength = (np.linspace(0.1, 3, 10000) * u.micron).to(u.AA)
+        norm = np.trapz(self.sensitivity(wavelength), wavelength)
+        return self.zeropoint, norm * self.zeropoint
 
     def flux_to_mag(self, flux):
         """Convert flux to magnitude based on the zeropoint of the detector"""
@@ -143,9 +653,7 @@ class DetectorMixins:
             raise ValueError("Must pass flux as a quantity.")
         if flux.unit == u.electron / u.second:
             # User has passed band pass integrated flux, but this is not normalized correctly
-            wavelength = (np.linspace(0.1, 3, 10000) * u.micron).to(u.AA)
-            norm = np.trapz(self.sensitivity(wavelength), wavelength)
-            return -2.5 * np.log10((flux / norm) / self.zeropoint)
+            return -2.5 * np.log10(flux / self._photometric_calibration[1])
         else:
             raise ValueError(
                 f"Must pass units of flux: {(u.electron / u.second).to_string()}."
@@ -156,7 +664,8 @@ class DetectorMixins:
         if not isinstance(average_flux_density, u.Quantity):
             raise ValueError("Must pass flux as a quantity.")
         if average_flux_density.unit == u.erg / u.AA / u.s / u.cm**2:
-            return -2.5 * np.log10(average_flux_density / self.zeropoint)
+            zeropoint = self._photometric_calibration[0]
+            return -2.5 * np.log10(average_flux_density / zeropoint)
         else:
             raise ValueError(
                 f"Must pass units of average flux density: {(u.erg / u.AA / u.s / u.cm).to_string()}."
@@ -168,9 +677,7 @@ class DetectorMixins:
             mag = u.Quantity(mag, u.dimensionless_unscaled)
         if mag.unit != u.dimensionless_unscaled:
             raise ValueError("Magnitude must have dimensionless units.")
-        wavelength = (np.linspace(0.1, 3, 10000) * u.micron).to(u.AA)
-        norm = np.trapz(self.sensitivity(wavelength), wavelength)
-        return norm * self.zeropoint * 10 ** (-mag / 2.5)
+        return self._photometric_calibration[1] * 10 ** (-mag / 2.5)
 
     def mag_to_average_flux_density(self, mag):
         """Convert magnitude to average flux density based on the zeropoint of the detector"""
@@ -178,6 +685,17 @@ class DetectorMixins:
             mag = u.Quantity(mag, u.dimensionless_unscaled)
         if mag.unit != u.dimensionless_unscaled:
             raise ValueError("Magnitude must have dimensionless units.")
-        wavelength = (np.linspace(0.1, 3, 10000) * u.micron).to(u.AA)
-        norm = np.trapz(self.sensitivity(wavelength), wavelength)
-        return norm * self.zeropoint * 10 ** (-mag / 2.5)
+        return self._photometric_calibration[1] * 10 ** (-mag / 2.5)
+
+
+def _sip_polynomial(coeffs, u, v):
+    """Evaluates a SIP polynomial with coefficients `coeffs[p, q]` of u**p * v**q."""
+    order = coeffs.shape[0] - 1
+    u_power, v_power = [np.ones_like(u), u], [np.ones_like(v), v]
+    for _ in range(order - 1):
+        u_power.append(u_power[-1] * u)
+        v_power.append(v_power[-1] * v)
+    result = np.zeros(np.broadcast(u, v).shape)
+    for p, q in zip(*np.nonzero(coeffs)):
+        result += coeffs[p, q] * (u_power[p] * v_power[q])
+    return result
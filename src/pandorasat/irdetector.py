@@ -5,13 +5,11 @@ from dataclasses import dataclass
 
 # Third-party
 import astropy.units as u
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import pandoraref as pr
 
 from . import PANDORASTYLE
-from .detectormixins import DetectorMixins
+from .detectormixins import DetectorMixins, reference_property
 
 
 @dataclass
@@ -112,14 +110,27 @@ class NIRDetector(DetectorMixins):
         "NIRDA saturation limit. Bias contributes to saturation."
         return 80000 * u.electron
 
-    @property
+    @reference_property
     def midpoint(self):
         """Mid point of the sensitivity function"""
         w = np.arange(0.1, 3, 0.005) * u.micron
         return np.average(w, weights=self.sensitivity(w))
 
+    @reference_property
+    def wavelength_grid(self):
+        """Wavelength at the center of each pixel along the NIRDA trace"""
+        # Positions are clamped to the ends of the calibrated trace
+        start, stop = self.reference.get_pixel_position(
+            [0.1, 3] * u.micron
+        ).value
+        pixel = np.arange(np.ceil(start), np.floor(stop) + 1) * u.pixel
+        return self.reference.get_wavelength_position(pixel)
+
     @property
     def info(self):
+        # Third-party
+        import pandas as pd
+
         return pd.DataFrame(
             {
                 "Detector Size": f"{self.shape}",
@@ -140,6 +151,9 @@ class NIRDetector(DetectorMixins):
 
     def plot_sensitivity(self, ax=None):
         """Plot the sensitivity of the detector as a function of wavelength"""
+        # Third-party
+        import matplotlib.pyplot as plt
+
         wavelength = np.linspace(0.6, 2, 1000) * u.micron
         pixel = self.reference.get_pixel_position(wavelength=wavelength)
         sens = self.reference.get_sensitivity(wavelength=wavelength)
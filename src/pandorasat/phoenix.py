@@ -1,10 +1,15 @@
 # Standard library
-import contextlib
 import functools
+import hashlib
+import json
 import os
 import shutil
+import sys
 import tarfile
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from glob import glob
 
 # Third-party
@@ -12,30 +17,212 @@ import astropy.units as u
 import numpy as np
 import requests
 import synphot
-from astroquery import log as asqlog
+from astropy.io import fits
 from tqdm import tqdm
 
 from . import CACHEDIR, PACKAGEDIR, PHOENIXGRIDPATH, PHOENIXPATH, logger
 
 __all__ = [
+    "download_file",
+    "download_files",
     "download_phoenix_grid",
+    "write_phoenix_manifest",
+    "check_phoenix_manifest",
+    "configure_synphot",
     "phoenixcontext",
     "build_phoenix",
+    "build_phoenix_cube",
+    "load_phoenix_cube",
+    "interpolate_phoenix_cube",
+    "rebin_matrix",
+    "rebin_spectrum",
+    "SEDCache",
+    "enable_sed_cache",
+    "disable_sed_cache",
+    "get_sed_cache",
     "get_phoenix_model",
     "download_vega",
     "SED",
+    "SED_batch",
     "load_benchmark",
 ]
 
+PHOENIXURL = (
+    "https://archive.stsci.edu/hlsps/reference-atlases/cdbs/grid/phoenix/"
+)
+SYNPHOTURL = "http://ssb.stsci.edu/trds/tarfiles/synphot1.tar.gz"
+VEGAURL = "http://ssb.stsci.edu/cdbs/calspec/alpha_lyr_stis_011.fits"
+FLAM = u.erg / u.cm**2 / u.s / u.angstrom
 
-def download_file(file_url, file_path):
-    # Download the file from `file_url` and save it locally under `file_path`
-    with requests.get(file_url, stream=True) as r:
-        r.raise_for_status()
-        with open(file_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-    # astropy_download_file(file_url, cache=True, show_progress=False, pkgname='pandorasat')
+
+def download_file(file_url, file_path, chunk_size=2**20, max_retries=3):
+    """
+    Downloads the file from `file_url` and saves it locally under `file_path`.
+
+    The file is downloaded to `file_path` + ".part" first, and only moved to
+    `file_path` once its size matches the size given by the server. If a
+    partial file already exists, or the connection drops, the download is
+    resumed with an HTTP range request. A partial file that is not part of
+    the file on the server, e.g. because it is larger, is deleted and
+    downloaded again.
+
+    Parameters
+    ----------
+    file_url : str
+        URL of the file to download.
+    file_path : str
+        Local path to save the file to.
+    chunk_size : int
+        Number of bytes to write at a time.
+    max_retries : int
+        Number of times to attempt to resume a failed download.
+
+    Returns
+    -------
+    size : int
+        Size of the downloaded file in bytes.
+    """
+    part_path = f"{file_path}.part"
+    for attempt in range(max_retries + 1):
+        pos = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        headers = {"Range": f"bytes={pos}-"} if pos else {}
+        try:
+            with requests.get(
+                file_url, stream=True, headers=headers, timeout=60
+            ) as r:
+                if r.status_code == 416:
+                    # The range starts at or past the end of the file. The
+                    # partial file is only complete if it is the size of the
+                    # file on the server, otherwise it is downloaded again.
+                    content_range = r.headers.get("Content-Range", "")
+                    total = content_range.rpartition("/")[2]
+                    if total.isdigit() and int(total) == pos:
+                        break
+                    logger.debug(
+                        f"Partial download of {file_url} does not match the "
+                        "server, downloading again."
+                    )
+                    os.remove(part_path)
+                    continue
+                r.raise_for_status()
+                if r.status_code != 206:
+                    pos = 0
+                expected = r.headers.get("Content-Length")
+                expected = None if expected is None else pos + int(expected)
+                with open(part_path, "ab" if pos else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+        except requests.exceptions.RequestException as e:
+            if attempt == max_retries:
+                raise e
+            logger.debug(f"Retrying download of {file_url}: {e}")
+            continue
+        if (expected is None) or (os.path.getsize(part_path) == expected):
+            break
+    else:
+        raise IOError(f"Could not download complete file from {file_url}.")
+    os.replace(part_path, file_path)
+    return os.path.getsize(file_path)
+
+
+def download_files(file_urls, file_paths, max_workers=8, desc=None):
+    """
+    Downloads many files in parallel using a pool of threads.
+
+    Parameters
+    ----------
+    file_urls : list of str
+        URLs of the files to download.
+    file_paths : list of str
+        Local paths to save each file to.
+    max_workers : int
+        Number of files to download at once.
+    desc : str
+        Description for the progress bar.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(download_file, file_url, file_path)
+            for file_url, file_path in zip(file_urls, file_paths)
+        ]
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc=desc,
+            leave=True,
+            position=0,
+        ):
+            future.result()
+
+
+def _file_checksum(file_path, chunk_size=2**20):
+    """Returns the SHA-256 checksum of a file."""
+    checksum = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def _manifest_path():
+    """Returns the path of the PHOENIX manifest file."""
+    return f"{PHOENIXPATH}manifest.json"
+
+
+def write_phoenix_manifest():
+    """
+    Writes a manifest of the size and checksum of each downloaded PHOENIX file.
+
+    The manifest covers the PHOENIX grid, its catalog and the Vega spectrum,
+    with paths relative to the PHOENIX directory. It is made from the local
+    files, so it only detects corruption after they were written. Transfers
+    are checked against the sizes reported by the server in `download_file`.
+    """
+    fnames = sorted(glob(f"{PHOENIXGRIDPATH}*.fits")) + [
+        f"{PHOENIXPATH}grid/phoenix/catalog.fits",
+        f"{PHOENIXPATH}calspec/alpha_lyr_stis_011.fits",
+    ]
+    manifest = {
+        os.path.relpath(fname, PHOENIXPATH): {
+            "size": os.path.getsize(fname),
+            "sha256": _file_checksum(fname),
+        }
+        for fname in fnames
+        if os.path.isfile(fname)
+    }
+    with open(_manifest_path(), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def check_phoenix_manifest(checksum=False):
+    """
+    Checks the downloaded PHOENIX files against the manifest.
+
+    Parameters
+    ----------
+    checksum : bool
+        Whether to also compare checksums. By default only file sizes are
+        compared, which is fast.
+
+    Returns
+    -------
+    bad : list of str or None
+        Paths, relative to the PHOENIX directory, of files which are missing
+        or do not match the manifest. None if there is no manifest.
+    """
+    if not os.path.isfile(_manifest_path()):
+        return None
+    with open(_manifest_path(), "r") as f:
+        manifest = json.load(f)
+    bad = []
+    for fname, entry in manifest.items():
+        path = os.path.join(PHOENIXPATH, fname)
+        if not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+            bad.append(fname)
+        elif checksum and (_file_checksum(path) != entry["sha256"]):
+            bad.append(fname)
+    return bad
 
 
 def download_vega():
@@ -54,7 +241,7 @@ def download_vega():
         )
         os.makedirs(PHOENIXPATH + "calspec", exist_ok=True)
         download_file(
-            "http://ssb.stsci.edu/cdbs/calspec/alpha_lyr_stis_011.fits",
+            VEGAURL,
             PHOENIXPATH + "calspec/alpha_lyr_stis_011.fits",
         )
         logger.warning(
@@ -63,14 +250,28 @@ def download_vega():
     # Third-party
 
 
-def download_phoenix_grid():
+def download_phoenix_grid(max_workers=8):
+    """
+    Downloads the PHOENIX grid, synphot throughput files and Vega spectrum.
+
+    Files are downloaded in parallel, and files that already exist and match
+    the manifest are not downloaded again, so an interrupted download can be
+    resumed by calling this function again.
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of files to download at once.
+    """
     logger.debug("Downloading PHOENIX grid.")
-    os.makedirs(CACHEDIR, exist_ok=True)
-    if os.path.isdir(PHOENIXPATH):
-        shutil.rmtree(PHOENIXPATH)
     os.makedirs(PHOENIXGRIDPATH, exist_ok=True)
-    url = "https://archive.stsci.edu/hlsps/reference-atlases/cdbs/grid/phoenix/phoenixm00/"
-    page = requests.get(url).text
+    bad = check_phoenix_manifest(checksum=True)
+    for fname in [] if bad is None else bad:
+        if os.path.isfile(os.path.join(PHOENIXPATH, fname)):
+            os.remove(os.path.join(PHOENIXPATH, fname))
+
+    url = f"{PHOENIXURL}phoenixm00/"
+    page = requests.get(url, timeout=60).text
     suffix = '.fits">'
     filenames = np.asarray(
         [
@@ -85,39 +286,49 @@ def download_phoenix_grid():
         filenames[np.argsort(temperatures)],
         temperatures[np.argsort(temperatures)],
     )
-    filenames = filenames[temperatures < 10000]
-    _ = [
-        download_file(f"{url}{filename}", f"{PHOENIXGRIDPATH}{filename}")
-        for filename in tqdm(
-            filenames,
-            desc="Downloading PHOENIX Models",
-            leave=True,
-            position=0,
-        )
+    filenames = [
+        filename
+        for filename in filenames[temperatures < 10000]
+        if not os.path.isfile(f"{PHOENIXGRIDPATH}{filename}")
     ]
-    download_file(
-        "http://ssb.stsci.edu/trds/tarfiles/synphot1.tar.gz",
-        f"{PHOENIXPATH}synphot1.tar.gz",
-    )
-    with tarfile.open(f"{PHOENIXPATH}synphot1.tar.gz") as tar:
-        tar.extractall(path=f"{PHOENIXPATH}")
-    os.remove(f"{PHOENIXPATH}synphot1.tar.gz")
-    fnames = glob(f"{PHOENIXPATH}grp/redcat/trds/*")
-    _ = [shutil.move(fname, f"{PHOENIXPATH}") for fname in fnames]
-    os.removedirs(f"{PHOENIXPATH}grp/redcat/trds/")
-    download_file(
-        "https://archive.stsci.edu/hlsps/reference-atlases/cdbs/grid/phoenix/catalog.fits",
-        f"{PHOENIXPATH}grid/phoenix/catalog.fits",
+    if len(filenames) > 0:
+        # Any existing cube is out of date
+        for fname in _phoenix_cube_paths():
+            if os.path.isfile(fname):
+                os.remove(fname)
+    download_files(
+        [f"{url}{filename}" for filename in filenames],
+        [f"{PHOENIXGRIDPATH}{filename}" for filename in filenames],
+        max_workers=max_workers,
+        desc="Downloading PHOENIX Models",
     )
+    if not os.path.isdir(f"{PHOENIXPATH}mtab"):
+        download_file(SYNPHOTURL, f"{PHOENIXPATH}synphot1.tar.gz")
+        with tarfile.open(f"{PHOENIXPATH}synphot1.tar.gz") as tar:
+            tar.extractall(path=f"{PHOENIXPATH}")
+        os.remove(f"{PHOENIXPATH}synphot1.tar.gz")
+        fnames = glob(f"{PHOENIXPATH}grp/redcat/trds/*")
+        _ = [shutil.move(fname, f"{PHOENIXPATH}") for fname in fnames]
+        os.removedirs(f"{PHOENIXPATH}grp/redcat/trds/")
+    if not os.path.isfile(f"{PHOENIXPATH}grid/phoenix/catalog.fits"):
+        download_file(
+            f"{PHOENIXURL}catalog.fits",
+            f"{PHOENIXPATH}grid/phoenix/catalog.fits",
+        )
     download_vega()
+    write_phoenix_manifest()
 
 
 def build_phoenix():
-    # Check if the directory exists and has any files
+    """Checks the PHOENIX grid against its manifest, and downloads it if needed."""
     os.makedirs(PHOENIXGRIDPATH, exist_ok=True)
-    if (
-        len(os.listdir(PHOENIXGRIDPATH)) == 65
-    ):  # The directory exists and has files in it
+    bad = check_phoenix_manifest()
+    if (bad is None) and (len(glob(f"{PHOENIXGRIDPATH}*.fits")) == 65):
+        # Grid was downloaded before manifests were written
+        logger.debug(f"Writing manifest for PHOENIX data in {PHOENIXPATH}.")
+        write_phoenix_manifest()
+        bad = check_phoenix_manifest()
+    if (bad is not None) and (len(bad) == 0):
         logger.debug(f"Found PHOENIX data in package in {PHOENIXGRIDPATH}.")
     else:
         logger.warning("No PHOENIX grid found, downloading grid.")
@@ -125,87 +336,795 @@ def build_phoenix():
         logger.warning("PHEONIX grid downloaded.")
 
 
+# The PHOENIX path that synphot and stsynphot are configured for, and their
+# settings from before they were first configured
+_SYNPHOT_LOCK = threading.Lock()
+_SYNPHOT_STATE = {"path": None, "defaults": None}
+
+
+def _import_stsynphot():
+    """Imports the parts of stsynphot used to configure it."""
+    if "stsynphot" not in sys.modules:
+        with warnings.catch_warnings():
+            # stsynphot tries to load Vega and extinction files on import
+            warnings.simplefilter("ignore")
+            # Third-party
+            import stsynphot  # noqa: F401
+    # Third-party
+    import stsynphot.spectrum
+    from stsynphot.config import conf, overwrite_synphot_config
+
+    return conf, overwrite_synphot_config, stsynphot.spectrum
+
+
+def _configure_synphot(phoenixpath):
+    """Points synphot and stsynphot at the data in `phoenixpath`, if they are not already."""
+    with _SYNPHOT_LOCK:
+        if _SYNPHOT_STATE["path"] == phoenixpath:
+            return
+        conf, overwrite_synphot_config, spectrum = _import_stsynphot()
+        if _SYNPHOT_STATE["defaults"] is None:
+            _SYNPHOT_STATE["defaults"] = {
+                "rootdir": conf.rootdir,
+                "synphot": {
+                    name: getattr(synphot.conf, name) for name in synphot.conf
+                },
+                "vega": spectrum.Vega,
+            }
+        vega_file = f"{phoenixpath}calspec/alpha_lyr_stis_011.fits"
+        conf.rootdir = phoenixpath
+        overwrite_synphot_config(phoenixpath)
+        synphot.conf.vega_file = vega_file
+        if os.path.isfile(vega_file):
+            spectrum.load_vega(vega_file)
+        _SYNPHOT_STATE["path"] = phoenixpath
+    logger.debug(f"synphot and stsynphot configured to use {phoenixpath}.")
+
+
+def _restore_synphot():
+    """Puts back the synphot and stsynphot settings from before `_configure_synphot`."""
+    with _SYNPHOT_LOCK:
+        defaults = _SYNPHOT_STATE["defaults"]
+        if defaults is None:
+            return
+        conf, _, spectrum = _import_stsynphot()
+        conf.rootdir = defaults["rootdir"]
+        for name, value in defaults["synphot"].items():
+            setattr(synphot.conf, name, value)
+        spectrum.Vega = defaults["vega"]
+        _SYNPHOT_STATE.update(path=None, defaults=None)
+
+
+def configure_synphot():
+    """
+    Configures synphot and stsynphot to use the PHOENIX data in the cache directory.
+
+    This sets the `stsynphot` root directory, the `synphot` data files and the
+    Vega spectrum. The configuration is global. It is only applied again if
+    the cache directory has changed since it was last applied, so this is
+    cheap to call, and calls from many threads are serialized by a lock.
+    """
+    _configure_synphot(PHOENIXPATH)
+
+
 def phoenixcontext():
     """
-    Decorator that temporarily sets the `PYSYN_CDBS` environment variable.
+    Decorator that makes sure synphot is configured before running a function.
 
-    Parameters
-    ----------
-    phoenixpath : str
-        The value to temporarily set for the `PYSYN_CDBS` environment variable.
+    This used to temporarily set the `PYSYN_CDBS` environment variable on every
+    call. It now calls `configure_synphot`, which only does any work when the
+    cache directory changes.
 
     Returns
     -------
     function
-        A wrapper function that sets `PYSYN_CDBS` to `phoenixpath` before
-        executing the decorated function and restores the original environment
-        afterwards.
+        A wrapper function that configures synphot before executing the
+        decorated function.
 
     Examples
     --------
-    Using `set_pysyn_cdbs` to temporarily set `PYSYN_CDBS` for a function:
-
-    >>> @set_pysyn_cdbs()
+    >>> @phoenixcontext()
     ... def my_function():
-    ...     # Within this function, os.environ["PYSYN_CDBS"] is set
+    ...     # Within this function, stsynphot uses the pandorasat data
     ...
     >>> my_function()
-    >>> 'PYSYN_CDBS' in os.environ
-    False
     """
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            logger.debug("Started pandorasat PHOENIX context.")
-            prev_vega = synphot.conf.vega_file
-            logger.debug(f"Vega file config was {synphot.conf.vega_file}.")
+            configure_synphot()
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
 
-            synphot.conf.vega_file = (
-                PHOENIXPATH + "calspec/alpha_lyr_stis_011.fits"
+def _phoenix_cube_paths():
+    """Returns the paths of the PHOENIX flux cube and its axes file."""
+    return (
+        f"{PHOENIXPATH}phoenix_cube_flux.npy",
+        f"{PHOENIXPATH}phoenix_cube_axes.npz",
+    )
+
+
+def build_phoenix_cube(overwrite=False):
+    """
+    Packs the downloaded PHOENIX grid into a single (teff, logg, wavelength) cube.
+
+    Every file in the grid is read once, cut to 0.1-3 micron and written into
+    a float32 `.npy` file in the cache directory, which can then be memory
+    mapped. The grid axes, and a mask of which grid points hold a valid
+    spectrum, are stored in a companion `.npz` file.
+
+    Parameters
+    ----------
+    overwrite : bool
+        Whether to rebuild the cube if it already exists.
+    """
+    fluxpath, axespath = _phoenix_cube_paths()
+    if os.path.isfile(fluxpath) and os.path.isfile(axespath) and not overwrite:
+        logger.debug(f"Found PHOENIX cube in {PHOENIXPATH}.")
+        return
+    fnames = glob(f"{PHOENIXGRIDPATH}*.fits")
+    if len(fnames) == 0:
+        raise ValueError(f"No PHOENIX grid files found in {PHOENIXGRIDPATH}.")
+    teffs = np.asarray(
+        [float(fname.split("_")[-1].split(".fits")[0]) for fname in fnames]
+    )
+    fnames = [fnames[idx] for idx in np.argsort(teffs)]
+    teffs = np.sort(teffs)
+
+    with fits.open(fnames[0]) as hdulist:
+        names = hdulist[1].columns.names
+        wave_unit = synphot.units.validate_unit(
+            hdulist[1].header.get("TUNIT1", "angstrom")
+        )
+        wavelength = u.Quantity(hdulist[1].data["WAVELENGTH"], wave_unit).to(
+            u.angstrom
+        )
+    logg_cols = sorted(
+        [name for name in names if name[0] == "g" and name[1:].isdigit()]
+    )
+    loggs = np.asarray([int(name[1:]) / 10 for name in logg_cols])
+    mask = (wavelength >= 0.1 * u.micron) & (wavelength <= 3 * u.micron)
+    wavelength = wavelength[mask].value
+
+    logger.warning("Building PHOENIX cube, this only happens once.")
+    tmppath = fluxpath.replace(".npy", ".tmp.npy")
+    cube = np.lib.format.open_memmap(
+        tmppath,
+        mode="w+",
+        dtype=np.float32,
+        shape=(len(teffs), len(loggs), len(wavelength)),
+    )
+    valid = np.zeros((len(teffs), len(loggs)), dtype=bool)
+    for idx, fname in enumerate(
+        tqdm(fnames, desc="Building PHOENIX cube", leave=True, position=0)
+    ):
+        with fits.open(fname) as hdulist:
+            data = hdulist[1].data
+            wave_unit = synphot.units.validate_unit(
+                hdulist[1].header.get("TUNIT1", "angstrom")
             )
-            logger.debug(f"Vega file config set to {synphot.conf.vega_file}.")
-            try:
-                with modified_environ(PYSYN_CDBS=PHOENIXPATH):
-                    return func(*args, **kwargs)
-            finally:
-                synphot.conf.vega_file = prev_vega
-            logger.debug(
-                f"Vega file config set back to {synphot.conf.vega_file}."
+            wave = (
+                u.Quantity(data["WAVELENGTH"], wave_unit).to(u.angstrom).value
             )
+            for jdx, col in enumerate(logg_cols):
+                if col not in data.columns.names:
+                    continue
+                flux = np.asarray(data[col], dtype=float)
+                if (len(wave) == len(mask)) and np.allclose(
+                    wave[mask], wavelength
+                ):
+                    flux = flux[mask]
+                else:
+                    flux = np.interp(wavelength, wave, flux)
+                cube[idx, jdx] = flux
+                valid[idx, jdx] = np.isfinite(flux).all() & (flux > 0).any()
+    cube.flush()
+    del cube
+    os.replace(tmppath, fluxpath)
+    np.savez(
+        axespath, teff=teffs, logg=loggs, wavelength=wavelength, valid=valid
+    )
+    logger.warning("PHOENIX cube built.")
 
-        return wrapper
 
-    return decorator
+@functools.lru_cache(maxsize=1)
+def load_phoenix_cube():
+    """
+    Loads the PHOENIX cube, building it if it does not yet exist.
 
+    Returns
+    -------
+    teff : np.ndarray
+        Effective temperature grid of the cube in Kelvin.
+    logg : np.ndarray
+        Log surface gravity grid of the cube.
+    wavelength : np.ndarray
+        Wavelength grid of the cube in Angstrom.
+    valid : np.ndarray
+        Boolean (teff, logg) mask of grid points that have a valid spectrum.
+    flux : np.memmap
+        Read only, memory mapped (teff, logg, wavelength) cube of surface flux
+        in ergs s^-1 cm^-2 Angstrom^-1.
+    """
+    fluxpath, axespath = _phoenix_cube_paths()
+    if not (os.path.isfile(fluxpath) and os.path.isfile(axespath)):
+        build_phoenix()
+        build_phoenix_cube()
+    axes = np.load(axespath)
+    flux = np.load(fluxpath, mmap_mode="r")
+    return (
+        axes["teff"],
+        axes["logg"],
+        axes["wavelength"],
+        axes["valid"],
+        flux,
+    )
+
+
+def _grid_position(grid, values, name):
+    """Returns the lower grid index and fractional position of each value."""
+    # Third-party
+    from stsynphot.exceptions import ParameterOutOfBounds
+
+    values = np.atleast_1d(np.asarray(values, dtype=float))
+    bad = ~((values >= grid[0]) & (values <= grid[-1]))
+    if bad.any():
+        raise ParameterOutOfBounds(
+            f"Parameter '{name}' exceeds data. "
+            f"Allowed range=({grid[0]}, {grid[-1]}), entered={values[bad]}."
+        )
+    idx = np.clip(
+        np.searchsorted(grid, values, side="right") - 1, 0, len(grid) - 2
+    )
+    frac = (values - grid[idx]) / (grid[idx + 1] - grid[idx])
+    return idx, frac
 
-@contextlib.contextmanager
-def modified_environ(**update):
+
+def interpolate_phoenix_cube(teff, logg):
     """
-    Temporarily updates the `os.environ` dictionary in-place and restores it upon exit.
+    Bilinearly interpolates the PHOENIX cube to a given temperature and surface gravity.
+
+    Parameters
+    ----------
+    teff : float or np.ndarray
+        The effective temperature of the star(s) (Kelvin).
+    logg : float or np.ndarray
+        The log surface gravity of the star(s) (log cgs).
+
+    Returns
+    -------
+    wavelength : np.ndarray
+        Wavelength grid of the cube in Angstrom.
+    flux : np.ndarray
+        Unnormalized surface flux in ergs s^-1 cm^-2 Angstrom^-1. If `teff`
+        and `logg` are arrays this has shape (nstar, nwave).
     """
-    env = os.environ
-    original_state = env.copy()
+    # Third-party
+    from stsynphot.exceptions import ParameterOutOfBounds
 
-    # Apply updates to the environment
-    env.update(update)
+    teff_grid, logg_grid, wavelength, valid, cube = load_phoenix_cube()
+    teff1, logg1 = np.broadcast_arrays(
+        np.asarray(teff, dtype=float), np.asarray(logg, dtype=float)
+    )
+    tdx, tfrac = _grid_position(teff_grid, teff1.ravel(), "T_eff")
+    gdx, gfrac = _grid_position(logg_grid, logg1.ravel(), "log_g")
+    flux = np.zeros((len(tdx), len(wavelength)))
+    for ti, tw in [(tdx, 1 - tfrac), (tdx + 1, tfrac)]:
+        for gi, gw in [(gdx, 1 - gfrac), (gdx + 1, gfrac)]:
+            weight = tw * gw
+            bad = (weight > 0) & ~valid[ti, gi]
+            if bad.any():
+                raise ParameterOutOfBounds(
+                    f"Parameters 'T_eff'={teff1.ravel()[bad]}, "
+                    f"'log_g'={logg1.ravel()[bad]} have no valid data."
+                )
+            flux += weight[:, None] * cube[ti, gi]
+    if teff1.ndim == 0:
+        return wavelength, flux[0]
+    return wavelength, flux
 
-    try:
-        yield
-    finally:
-        # Restore original environment
-        env.clear()
-        env.update(original_state)
 
+def _has_phoenix_data(teff, logg):
+    """Returns whether each Teff and logg can be interpolated from the PHOENIX cube."""
+    teff_grid, logg_grid, _, valid, _ = load_phoenix_cube()
+    teff, logg = np.broadcast_arrays(
+        np.asarray(teff, dtype=float), np.asarray(logg, dtype=float)
+    )
+    # Non-finite values fail these comparisons
+    inside = (teff >= teff_grid[0]) & (teff <= teff_grid[-1])
+    inside &= (logg >= logg_grid[0]) & (logg <= logg_grid[-1])
+    good = np.zeros(teff.shape, bool)
+    if inside.any():
+        tdx, tfrac = _grid_position(teff_grid, teff[inside], "T_eff")
+        gdx, gfrac = _grid_position(logg_grid, logg[inside], "log_g")
+        bad = np.zeros(tdx.shape, bool)
+        for ti, tw in [(tdx, 1 - tfrac), (tdx + 1, tfrac)]:
+            for gi, gw in [(gdx, 1 - gfrac), (gdx + 1, gfrac)]:
+                bad |= (tw * gw > 0) & ~valid[ti, gi]
+        good[inside] = ~bad
+    return good
+
+
+def _trapezoid_weights(wavelength):
+    """Returns the weights w such that w.dot(y) is the trapezoid integral of y."""
+    dw = np.diff(wavelength)
+    weights = np.zeros(len(wavelength))
+    weights[:-1] += dw / 2
+    weights[1:] += dw / 2
+    return weights
+
+
+def _get_band_normalization(band):
+    """
+    Returns the throughput of a Johnson band and the photon flux of Vega through it.
+
+    These are calculated with `stsynphot` once, and then stored in the cache
+    directory so that other processes do not need to load the band or Vega.
+
+    Parameters
+    ----------
+    band : str
+        Either "johnson,j" or "johnson,v".
+
+    Returns
+    -------
+    wavelength : np.ndarray
+        Wavelength of the band in Angstrom.
+    throughput : np.ndarray
+        Throughput of the band.
+    stdflux : float
+        Integral of Vega's flux times wavelength through the band.
+    """
+    fname = f"{PHOENIXPATH}normalization_{band.replace(',', '_')}.npz"
+    if os.path.isfile(fname):
+        data = np.load(fname)
+        return data["wavelength"], data["throughput"], float(data["stdflux"])
+
+    # Third-party
+    import stsynphot as stsyn
+    from synphot import SourceSpectrum
+
+    download_vega()
+    configure_synphot()
+    bp = stsyn.band(band)
+    vega = SourceSpectrum.from_file(
+        PHOENIXPATH + "calspec/alpha_lyr_stis_011.fits"
+    )
+    wavelength = bp.waveset.to(u.angstrom).value
+    throughput = bp(wavelength).value
+    vega_wave = vega.waveset.to(u.angstrom).value
+    vega_wave = np.union1d(
+        vega_wave[
+            (vega_wave >= wavelength.min()) & (vega_wave <= wavelength.max())
+        ],
+        wavelength,
+    )
+    stdflux = np.trapz(
+        vega(vega_wave, flux_unit="flam").value
+        * bp(vega_wave).value
+        * vega_wave,
+        vega_wave,
+    )
+    os.makedirs(PHOENIXPATH, exist_ok=True)
+    np.savez(
+        fname, wavelength=wavelength, throughput=throughput, stdflux=stdflux
+    )
+    return wavelength, throughput, stdflux
 
-asqlog.setLevel("ERROR")
 
+@functools.lru_cache(maxsize=None)
+def _get_band_weights(band):
+    """
+    Returns the weights that integrate a spectrum on the PHOENIX cube grid through a Johnson band.
 
-@phoenixcontext()
-def get_phoenix_model(teff, logg=4.5, jmag=None, vmag=None):
+    Parameters
+    ----------
+    band : str
+        Either "johnson,j" or "johnson,v".
+
+    Returns
+    -------
+    weights : np.ndarray
+        Weights w, such that w.dot(flux) is the photon flux through the band.
+    stdflux : float
+        The same integral for Vega.
+    """
+    wavelength = load_phoenix_cube()[2]
+    band_wave, band_throughput, stdflux = _get_band_normalization(band)
+    weights = (
+        np.interp(wavelength, band_wave, band_throughput, left=0, right=0)
+        * wavelength
+        * _trapezoid_weights(wavelength)
+    )
+    weights.flags.writeable = False
+    return weights, stdflux
+
+
+def _normalize_phoenix(flux, jmag=None, vmag=None):
+    """
+    Scales PHOENIX spectra to a Johnson J or V Vega magnitude.
+
+    This is the same calculation as `synphot.SourceSpectrum.normalize` with
+    VEGAMAG units. The band and Vega integrals are precomputed, so this is
+    one dot product per spectrum.
+
+    Parameters
+    ----------
+    flux : np.ndarray
+        Flux on the PHOENIX cube wavelength grid in ergs s^-1 cm^-2 Angstrom^-1,
+        with wavelength as the last axis.
+    jmag : float or np.ndarray
+        The Johnson J-band magnitude of the star(s).
+    vmag : float or np.ndarray
+        The Johnson V-band magnitude of the star(s).
+
+    Returns
+    -------
+    flux : np.ndarray
+        Normalized flux in ergs s^-1 cm^-2 Angstrom^-1.
+    """
+    if (jmag is not None) & (vmag is None):
+        band, mag = "johnson,j", jmag
+    elif (jmag is None) & (vmag is not None):
+        band, mag = "johnson,v", vmag
+    else:
+        raise ValueError("Input one of either `jmag` or `vmag`")
+    weights, stdflux = _get_band_weights(band)
+    totalflux = flux.dot(weights)
+    scale = 10 ** (-0.4 * np.asarray(mag, dtype=float)) * stdflux / totalflux
+    return flux * np.asarray(scale)[..., None]
+
+
+class SEDCache:
+    """
+    Least recently used cache of unnormalized PHOENIX spectra.
+
+    Spectra are keyed on Teff and logg rounded to a tolerance, and are
+    interpolated at the rounded values, so every star that falls in the same
+    bin gets the same spectrum. Normalizing a cached spectrum to a magnitude
+    is a single scale factor.
+
+    Parameters
+    ----------
+    teff_tolerance : float
+        Teff is rounded to a multiple of this value (Kelvin).
+    logg_tolerance : float
+        logg is rounded to a multiple of this value.
+    max_memory : float
+        Maximum size of the cached spectra in MB. Least recently used spectra
+        are evicted past this size.
+    """
+
+    def __init__(
+        self, teff_tolerance=10.0, logg_tolerance=0.05, max_memory=512
+    ):
+        self.teff_tolerance = teff_tolerance
+        self.logg_tolerance = logg_tolerance
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __repr__(self):
+        return f"SEDCache ({len(self._cache)} spectra, {self.stats['hit_rate']:.0%} hit rate)"
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        with self._lock:
+            self._cache = OrderedDict()
+            self._nbytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def stats(self):
+        """Dictionary of hit, miss and eviction counts, and the size of the cache."""
+        calls = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / calls if calls else 0.0,
+            "evictions": self._evictions,
+            "entries": len(self._cache),
+            "memory": self._nbytes / 2**20,
+        }
+
+    def quantize(self, teff, logg):
+        """
+        Rounds Teff and logg to the tolerances of the cache.
+
+        Rounded values are clipped to the edges of the PHOENIX grid, and
+        stars whose rounded cell touches a grid point with no valid spectrum
+        keep their exact parameters, so any star that can be interpolated
+        without the cache can also be interpolated with it.
+        """
+        teff_grid, logg_grid = load_phoenix_cube()[:2]
+        teff, logg = np.broadcast_arrays(
+            np.asarray(teff, float), np.asarray(logg, float)
+        )
+        qteff = np.clip(
+            np.round(teff / self.teff_tolerance) * self.teff_tolerance,
+            teff_grid[0],
+            teff_grid[-1],
+        )
+        qlogg = np.clip(
+            np.round(logg / self.logg_tolerance) * self.logg_tolerance,
+            logg_grid[0],
+            logg_grid[-1],
+        )
+        good = _has_phoenix_data(qteff, qlogg)
+        return np.where(good, qteff, teff), np.where(good, qlogg, logg)
+
+    def get(self, teff, logg):
+        """
+        Returns unnormalized spectra for arrays of Teff and logg.
+
+        Parameters
+        ----------
+        teff : float or np.ndarray
+            The effective temperature of the star(s) (Kelvin).
+        logg : float or np.ndarray
+            The log surface gravity of the star(s) (log cgs).
+
+        Returns
+        -------
+        flux : np.ndarray
+            Unnormalized surface flux on the PHOENIX cube wavelength grid.
+            If `teff` and `logg` are arrays this has shape (nstar, nwave).
+        """
+        teff_grid, logg_grid = load_phoenix_cube()[:2]
+        # Stars off the grid raise, as they do without the cache, rather than
+        # being clipped onto its edge
+        _grid_position(teff_grid, teff, "T_eff")
+        _grid_position(logg_grid, logg, "log_g")
+        teff, logg = self.quantize(teff, logg)
+        keys, inverse = np.unique(
+            np.vstack([teff.ravel(), logg.ravel()]).T,
+            axis=0,
+            return_inverse=True,
+        )
+        keys = [tuple(key) for key in keys]
+        with self._lock:
+            fluxes = [self._cache.get(key) for key in keys]
+            for key, flux in zip(keys, fluxes):
+                if flux is not None:
+                    self._cache.move_to_end(key)
+            missing = [idx for idx, flux in enumerate(fluxes) if flux is None]
+            # Every spectrum that does not need interpolating counts as a hit
+            self._hits += teff.size - len(missing)
+            self._misses += len(missing)
+        if len(missing) > 0:
+            new = interpolate_phoenix_cube(
+                np.asarray([keys[idx][0] for idx in missing]),
+                np.asarray([keys[idx][1] for idx in missing]),
+            )[1]
+            new.flags.writeable = False
+            with self._lock:
+                for idx, flux in zip(missing, new):
+                    fluxes[idx] = flux
+                    if keys[idx] not in self._cache:
+                        self._nbytes += flux.nbytes
+                    self._cache[keys[idx]] = flux
+                self._evict()
+        flux = np.asarray(fluxes)[inverse.ravel()]
+        if teff.ndim == 0:
+            return flux[0]
+        return flux
+
+    def _evict(self):
+        """Removes least recently used spectra until the cache fits in memory."""
+        while self._cache and (self._nbytes > self.max_memory * 2**20):
+            _, flux = self._cache.popitem(last=False)
+            self._nbytes -= flux.nbytes
+            self._evictions += 1
+
+
+_SED_CACHE = None
+
+
+def enable_sed_cache(teff_tolerance=10.0, logg_tolerance=0.05, max_memory=512):
+    """
+    Turns on caching of PHOENIX spectra in `SED`, `SED_batch` and `get_phoenix_model`.
+
+    Parameters
+    ----------
+    teff_tolerance : float
+        Teff is rounded to a multiple of this value (Kelvin).
+    logg_tolerance : float
+        logg is rounded to a multiple of this value.
+    max_memory : float
+        Maximum size of the cached spectra in MB.
+
+    Returns
+    -------
+    cache : SEDCache
+        The cache, which can be used to check the hit rate.
+    """
+    global _SED_CACHE
+    _SED_CACHE = SEDCache(
+        teff_tolerance=teff_tolerance,
+        logg_tolerance=logg_tolerance,
+        max_memory=max_memory,
+    )
+    return _SED_CACHE
+
+
+def disable_sed_cache():
+    """Turns off caching of PHOENIX spectra."""
+    global _SED_CACHE
+    _SED_CACHE = None
+
+
+def get_sed_cache():
+    """Returns the current SEDCache, or None if caching is turned off."""
+    return _SED_CACHE
+
+
+def _reset_caches():
+    """
+    Clears everything read from the PHOENIX directory, so it is read again.
+
+    This is needed when the files in the directory are replaced, e.g. by
+    `bundle.import_phoenix_bundle`.
+    """
+    load_phoenix_cube.cache_clear()
+    _get_band_weights.cache_clear()
+    _cached_rebin_matrix.cache_clear()
+    _load_vega_data.cache_clear()
+    with _SYNPHOT_LOCK:
+        _SYNPHOT_STATE["path"] = None
+    if _SED_CACHE is not None:
+        _SED_CACHE.clear()
+
+
+def _get_phoenix_flux(teff, logg):
+    """Returns unnormalized PHOENIX spectra, using the SED cache if it is turned on."""
+    if _SED_CACHE is None:
+        return interpolate_phoenix_cube(teff, logg)
+    flux = _SED_CACHE.get(teff, logg)
+    return load_phoenix_cube()[2], flux
+
+
+def _bin_edges(wavelength):
+    """Returns the edges of bins centered on `wavelength`."""
+    if len(wavelength) < 2 or not np.all(np.diff(wavelength) > 0):
+        raise ValueError(
+            "Wavelength grid must have at least two strictly increasing values."
+        )
+    mid = 0.5 * (wavelength[1:] + wavelength[:-1])
+    return np.concatenate(
+        [
+            [2 * wavelength[0] - mid[0]],
+            mid,
+            [2 * wavelength[-1] - mid[-1]],
+        ]
+    )
+
+
+def rebin_matrix(wavelength, new_wavelength):
+    """
+    Builds the sparse matrix that rebins a spectrum onto a new wavelength grid.
+
+    The spectrum is treated as constant across each bin, so that the integral
+    of the flux density over every new bin is conserved. New bins that fall
+    partly outside of the original grid are padded with zeros.
+
+    Parameters
+    ----------
+    wavelength : np.ndarray
+        Increasing bin centers of the original spectrum.
+    new_wavelength : np.ndarray
+        Increasing bin centers of the new grid, in the same units.
+
+    Returns
+    -------
+    matrix : scipy.sparse.csr_matrix
+        Matrix with shape (len(new_wavelength), len(wavelength)), such that
+        `matrix.dot(flux)` is the flux density on the new grid.
+    """
+    # Third-party
+    from scipy import sparse
+
+    edges = _bin_edges(np.asarray(wavelength, float))
+    new_edges = _bin_edges(np.asarray(new_wavelength, float))
+    nold, nnew = len(edges) - 1, len(new_edges) - 1
+
+    # Each new bin overlaps a contiguous run of the old bins
+    start = np.searchsorted(edges, new_edges[:-1], side="right") - 1
+    stop = np.searchsorted(edges, new_edges[1:], side="left")
+    start, stop = np.clip(start, 0, nold), np.clip(stop, 0, nold)
+    counts = np.maximum(stop - start, 0)
+    rows = np.repeat(np.arange(nnew), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    cols = np.repeat(start, counts) + offsets
+
+    overlap = np.minimum(new_edges[1:][rows], edges[1:][cols]) - np.maximum(
+        new_edges[:-1][rows], edges[:-1][cols]
+    )
+    weights = np.clip(overlap, 0, None) / np.diff(new_edges)[rows]
+    matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(nnew, nold))
+    matrix.eliminate_zeros()
+    return matrix
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_rebin_matrix(wavelength, new_wavelength):
+    """Caches `rebin_matrix` for grids passed as float64 bytes."""
+    return rebin_matrix(
+        np.frombuffer(wavelength), np.frombuffer(new_wavelength)
+    )
+
+
+def rebin_spectrum(wavelength, flux, new_wavelength):
+    """
+    Rebins spectra onto a new wavelength grid, conserving flux.
+
+    The rebinning matrix for each pair of grids is only built once, so
+    rebinning many spectra onto the same detector grid is a single sparse
+    matrix product.
+
+    Parameters
+    ----------
+    wavelength : u.Quantity or np.ndarray
+        Increasing wavelengths of the spectra, in microns if not a Quantity.
+    flux : np.ndarray or u.Quantity
+        Flux density, with shape (nwave,) or (nspec, nwave).
+    new_wavelength : u.Quantity or np.ndarray
+        Increasing wavelengths to rebin onto, in microns if not a Quantity.
+
+    Returns
+    -------
+    flux : np.ndarray or u.Quantity
+        Flux density on the new grid, with shape (nnew,) or (nspec, nnew).
+    """
+    wavelength = np.ascontiguousarray(
+        u.Quantity(wavelength, u.micron).to_value(u.micron), float
+    )
+    new_wavelength = np.ascontiguousarray(
+        u.Quantity(new_wavelength, u.micron).to_value(u.micron), float
+    )
+    matrix = _cached_rebin_matrix(
+        wavelength.tobytes(), new_wavelength.tobytes()
+    )
+    flux_unit = flux.unit if isinstance(flux, u.Quantity) else None
+    flux = np.asarray(u.Quantity(flux).value if flux_unit else flux)
+    new_flux = matrix.dot(flux.T).T
+    if flux_unit is not None:
+        return new_flux * flux_unit
+    return new_flux
+
+
+def _on_wavelength_grid(wavelength, flux, new_wavelength=None):
+    """
+    Returns PHOENIX fluxes in Angstrom units, rebinned if a grid is given.
+
+    Grids without units are taken to be in microns, as elsewhere in the
+    package.
+    """
+    if new_wavelength is not None:
+        new_wavelength = u.Quantity(new_wavelength, u.micron).to(u.angstrom)
+        flux = rebin_spectrum(wavelength * u.angstrom, flux, new_wavelength)
+        wavelength = new_wavelength.value
+    return (
+        wavelength * u.angstrom,
+        flux * u.erg / u.s / u.cm**2 / u.angstrom,
+    )
+
+
+def get_phoenix_model(teff, logg=4.5, jmag=None, vmag=None, wavelength=None):
     """
     Function that interpolates the PHOENIX grid to a given temperature and surface gravity.
-    Returns a SED for a star normalized by its Johnson J or V magnitude via STSynPhot.
+    Returns a SED for a star normalized by its Johnson J or V magnitude.
+
+    The PHOENIX grid is read from a precomputed, memory mapped cube (see `build_phoenix_cube`).
+    The Johnson bands and Vega are only evaluated through STSynPhot once.
 
     Parameters
     ----------
@@ -217,71 +1136,81 @@ def get_phoenix_model(teff, logg=4.5, jmag=None, vmag=None):
         The Johnson J-band magnitude of the star.
     vmag : float
         The Johnson V-band magnitude of the star.
+    wavelength : u.Quantity, optional
+        Increasing wavelengths to return the SED on, e.g. the wavelength of
+        each pixel of a detector, in microns if not a Quantity. The SED is
+        rebinned onto this grid conserving flux. If None, the PHOENIX cube
+        wavelengths are used.
 
     Returns
     -------
     wavelength : array
-        An array of wavelengths from 1,000 to 30,000 Angstroms.
+        An array of wavelengths from 1,000 to 30,000 Angstroms, or the
+        requested wavelengths in Angstroms.
     sed : array
         The SED of the star, in units of ergs s^-1 cm^-2 Angstrom^-1.
     """
-    # Third-party
-    import stsynphot as stsyn
-    from synphot import units as su
-
-    build_phoenix()
-    with warnings.catch_warnings():
-        warnings.filterwarnings(
-            "ignore", message="Extinction files not found in "
-        )
-        # Third-party
-
     logg1 = logg.value if isinstance(logg, u.Quantity) else logg
-    star = stsyn.grid_to_spec(
-        "phoenix",
+    new_wavelength = wavelength
+    wavelength, flux = _get_phoenix_flux(
         teff.value if isinstance(teff, u.Quantity) else teff,
-        0,
         logg1 if np.isfinite(logg1) else 5,
     )
-    vega = stsyn.Vega
-    logger.debug(f"Vega spectrum set to {vega}")
-    if (jmag is not None) & (vmag is None):
-        star_norm = star.normalize(
-            jmag * su.VEGAMAG,
-            band=stsyn.band("johnson,j"),
-            vegaspec=vega,
-        )
-    elif (jmag is None) & (vmag is not None):
-        star_norm = star.normalize(
-            vmag * su.VEGAMAG,
-            band=stsyn.band("johnson,v"),
-            vegaspec=vega,
-        )
+    sed = _normalize_phoenix(flux, jmag=jmag, vmag=vmag)
+    return _on_wavelength_grid(wavelength, sed, new_wavelength)
+
+
+def _load_spectrum_sidecar(source, sidecar, reader):
+    """
+    Returns a read-only (2, n) array of wavelength and flux from `source`.
+
+    The array is read from a `.npy` sidecar file, which is written with
+    `reader` the first time, or whenever `source` is newer than the sidecar.
+    """
+    if os.path.isfile(sidecar) and (
+        os.path.getmtime(sidecar) >= os.path.getmtime(source)
+    ):
+        data = np.load(sidecar)
     else:
-        raise ValueError("Input one of either `jmag` or `vmag`")
+        data = np.asarray(reader(source), dtype=float)
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            tmp = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.npy"
+            np.save(tmp, data)
+            os.replace(tmp, sidecar)
+        except OSError as e:
+            logger.debug(f"Could not write {sidecar}: {e}")
+    data.flags.writeable = False
+    return data
 
-    wave = star_norm.waveset.to(u.micron)
-    mask = (wave >= 0.1 * u.micron) * (wave <= 3 * u.micron)
 
-    sed = (
-        star_norm(wave, flux_unit="flam")[mask]
-        / su.FLAM
-        * u.erg
-        / u.s
-        / u.cm**2
-        / u.angstrom
+def _read_vega(source):
+    """Reads the Vega spectrum with synphot."""
+    # Third-party
+    from synphot import SourceSpectrum
+
+    vega = SourceSpectrum.from_file(source)
+    return (
+        vega.waveset.to(u.angstrom).value,
+        vega(vega.waveset, flux_unit="flam").value,
     )
 
-    wavelength = wave[mask]
-    wavelength = wavelength.to(u.angstrom)
 
-    return wavelength, sed
+@functools.lru_cache(maxsize=None)
+def _load_vega_data(source):
+    """Returns the read-only Vega spectrum, loaded once per process."""
+    return _load_spectrum_sidecar(
+        source, f"{os.path.splitext(source)[0]}.npy", _read_vega
+    )
 
 
-@phoenixcontext()
 def load_vega():
     """Loads a spectrum of Vega using synphot
 
+    The spectrum is only read once per process, and is stored next to the
+    Vega file as a `.npy` file for other processes. The returned arrays are
+    read-only views of the cached spectrum.
+
     Returns
     -------
     wavelength : array
@@ -289,29 +1218,109 @@ def load_vega():
     sed : array
         The SED of the Vega, in units of ergs s^-1 cm^-2 Angstrom^-1.
     """
-    # Third-party
-    from synphot import SourceSpectrum
-
     download_vega()
-    # Third-party
+    wavelength, spectrum = _load_vega_data(
+        PHOENIXPATH + "calspec/alpha_lyr_stis_011.fits"
+    )
+    return (
+        wavelength << u.angstrom,
+        spectrum << FLAM,
+    )
 
-    vega = SourceSpectrum.from_vega()
-    wavelength, spectrum = vega.waveset, vega(vega.waveset, flux_unit="flam")
 
-    spectrum = spectrum.value * u.erg / u.cm**2 / u.s / u.angstrom
-    return wavelength, spectrum
+def SED(teff, logg=4.5, jmag=None, vmag=None, wavelength=None):
+    """Gives a model SED for a given Teff, logg and magnitude."""
+    return get_phoenix_model(
+        teff, logg=logg, jmag=jmag, vmag=vmag, wavelength=wavelength
+    )
 
 
-def SED(teff, logg=4.5, jmag=None, vmag=None):
-    """Gives a model SED for a given Teff, logg and magnitude."""
-    return get_phoenix_model(teff, logg=logg, jmag=jmag, vmag=vmag)
+def SED_batch(
+    teff, logg=4.5, jmag=None, vmag=None, wavelength=None, errors="raise"
+):
+    """
+    Gives model SEDs for arrays of Teff, logg and magnitude.
+
+    All SEDs are interpolated from the PHOENIX cube and normalized as array
+    operations, and are returned on the shared wavelength grid of the cube.
+
+    Parameters
+    ----------
+    teff : np.ndarray
+        The effective temperature of each star (Kelvin).
+    logg : np.ndarray
+        The log surface gravity of each star (log cgs). Non-finite values
+        are replaced with 5.
+    jmag : np.ndarray
+        The Johnson J-band magnitude of each star.
+    vmag : np.ndarray
+        The Johnson V-band magnitude of each star.
+    wavelength : u.Quantity, optional
+        Increasing wavelengths to return the SEDs on, in microns if not a
+        Quantity. The SEDs are rebinned onto this grid conserving flux. If
+        None, the PHOENIX cube wavelengths are used.
+    errors : {"raise", "nan"}
+        What to do with stars whose Teff or logg are not finite, or are
+        outside of the PHOENIX grid. If "raise", a `ParameterOutOfBounds`
+        error is raised. If "nan", the SEDs of those stars are NaN, and the
+        rest of the batch is returned as normal.
+
+    Returns
+    -------
+    wavelength : array
+        An array of wavelengths from 1,000 to 30,000 Angstroms, or the
+        requested wavelengths in Angstroms.
+    sed : array
+        The SED of each star with shape (nstar, nwave), in units of
+        ergs s^-1 cm^-2 Angstrom^-1.
+    """
+    if errors not in ["raise", "nan"]:
+        raise ValueError("`errors` must be 'raise' or 'nan'.")
+    teff = np.atleast_1d(u.Quantity(teff, u.K).value)
+    logg = np.atleast_1d(u.Quantity(logg).value).astype(float)
+    teff, logg = np.broadcast_arrays(teff, logg)
+    logg = np.where(np.isfinite(logg), logg, 5)
+    if jmag is not None:
+        jmag = np.broadcast_to(np.atleast_1d(jmag), teff.shape)
+    if vmag is not None:
+        vmag = np.broadcast_to(np.atleast_1d(vmag), teff.shape)
+
+    new_wavelength = wavelength
+    if errors == "raise":
+        wavelength, flux = _get_phoenix_flux(teff, logg)
+        flux = _normalize_phoenix(flux, jmag=jmag, vmag=vmag)
+        return _on_wavelength_grid(wavelength, flux, new_wavelength)
+    good = _has_phoenix_data(teff, logg)
+    wavelength = load_phoenix_cube()[2]
+    flux = np.zeros((len(teff), len(wavelength)))
+    if good.any():
+        flux[good] = _normalize_phoenix(
+            _get_phoenix_flux(teff[good], logg[good])[1],
+            jmag=None if jmag is None else jmag[good],
+            vmag=None if vmag is None else vmag[good],
+        )
+    wavelength, sed = _on_wavelength_grid(wavelength, flux, new_wavelength)
+    sed[~good] = np.nan
+    return wavelength, sed
+
+
+@functools.lru_cache(maxsize=None)
+def _load_benchmark_data():
+    """Returns the read-only benchmark SED, loaded once per process."""
+    return _load_spectrum_sidecar(
+        f"{PACKAGEDIR}/data/benchmark.csv",
+        f"{CACHEDIR}/data/benchmark.npy",
+        lambda source: np.loadtxt(source, delimiter=",").T,
+    )
 
 
 def load_benchmark():
-    """Benchmark SED is a 3260K star which is 9th magnitude in j band, which is therefore 13th magnitude in Pandora Visible Band."""
-    wavelength, spectrum = np.loadtxt(
-        f"{PACKAGEDIR}/data/benchmark.csv", delimiter=","
-    ).T
-    wavelength *= u.angstrom
-    spectrum *= u.erg / u.cm**2 / u.s / u.angstrom
-    return wavelength, spectrum
+    """Benchmark SED is a 3260K star which is 9th magnitude in j band, which is therefore 13th magnitude in Pandora Visible Band.
+
+    The returned arrays are read-only views of a copy cached in memory.
+    """
+    wavelength, spectrum = _load_benchmark_data()
+    return (
+        wavelength << u.angstrom,
+        spectrum << FLAM,
+    )
@@ -5,13 +5,11 @@ from dataclasses import dataclass
 
 # Third-party
 import astropy.units as u
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import pandoraref as pr
 
 from . import PANDORASTYLE
-from .detectormixins import DetectorMixins
+from .detectormixins import DetectorMixins, reference_property
 
 
 @dataclass
@@ -92,7 +90,7 @@ class VisibleDetector(DetectorMixins):
         "Radius of the fieldstop"
         return 6.5 * u.mm
 
-    @property
+    @reference_property
     def midpoint(self):
         """Mid point of the sensitivity function"""
         w = np.arange(0.1, 3, 0.005) * u.micron
@@ -149,6 +147,9 @@ class VisibleDetector(DetectorMixins):
 
     @property
     def info(self):
+        # Third-party
+        import pandas as pd
+
         zp = self.zeropoint
         return pd.DataFrame(
             {
@@ -168,6 +169,9 @@ class VisibleDetector(DetectorMixins):
 
     def plot_sensitivity(self, ax=None):
         """Plot the sensitivity of the detector as a function of wavelength"""
+        # Third-party
+        import matplotlib.pyplot as plt
+
         wavelength = np.linspace(0.1, 1, 1000) * u.micron
         sens = self.reference.get_sensitivity(wavelength=wavelength)
         if ax is None:
@@ -0,0 +1,446 @@
+# Standard library
+import concurrent.futures
+import os
+import threading
+import time
+
+# Third-party
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import Distance, SkyCoord
+from astropy.table import MaskedColumn, Table, vstack
+from astropy.time import Time
+
+# First-party/Local
+from pandorasat import catalog
+
+
+def fake_gaia_table(ra, dec, radius, nstars=200, seed=42):
+    """Makes a table of stars in a cone, in the format of `catalog.query_gaia`."""
+    rng = np.random.default_rng(seed)
+    r = radius * np.sqrt(rng.uniform(0, 1, nstars))
+    phi = rng.uniform(0, 2 * np.pi, nstars)
+    star_dec = dec + r * np.sin(phi)
+    star_ra = ra + r * np.cos(phi) / np.cos(np.deg2rad(star_dec))
+    missing = rng.uniform(0, 1, nstars) < 0.2
+    tbl = Table(
+        {
+            "source_id": rng.integers(1, 2**62, nstars),
+            "ra": star_ra,
+            "dec": star_dec,
+            "parallax": rng.uniform(0.1, 10, nstars),
+            "pmra": rng.normal(0, 20, nstars),
+            "pmdec": rng.normal(0, 20, nstars),
+            "radial_velocity": MaskedColumn(
+                rng.normal(0, 30, nstars), mask=missing
+            ),
+            "ruwe": rng.uniform(0.8, 1.5, nstars),
+            "phot_bp_mean_mag": rng.uniform(8, 19, nstars),
+            "teff_gspphot": MaskedColumn(
+                rng.uniform(3000, 7000, nstars), mask=missing
+            ),
+            "logg_gspphot": MaskedColumn(
+                rng.uniform(4, 5, nstars), mask=missing
+            ),
+            "phot_g_mean_flux": rng.uniform(1e3, 1e6, nstars),
+            "phot_g_mean_mag": rng.uniform(8, 19, nstars),
+            "dr2_teff_val": rng.uniform(3000, 7000, nstars),
+            "dr2_logg": rng.uniform(4, 5, nstars),
+            "j_m": rng.uniform(6, 17, nstars),
+            "j_msigcom": rng.uniform(0.01, 0.1, nstars),
+            "ph_qual": np.asarray(["AAA"] * nstars),
+        }
+    )
+    return tbl
+
+
+# A patch of fake sky that the fake Gaia archive answers queries from
+FAKE_SKY = fake_gaia_table(210.8, 54.3, 3, nstars=20000)
+
+
+@pytest.fixture
+def fake_gaia(tmp_path, monkeypatch):
+    """Replaces the Gaia archive with a patch of fake sky, and counts the queries."""
+    queries = []
+
+    def query_gaia(
+        ra, dec, radius, gbpmagnitude_range=(-3, 20), limit=None, **kwargs
+    ):
+        queries.append((ra, dec, radius))
+        ang_sep = catalog._angular_separation(
+            ra, dec, FAKE_SKY["ra"], FAKE_SKY["dec"]
+        )
+        k = (
+            (ang_sep < radius)
+            & (FAKE_SKY["phot_bp_mean_mag"] > gbpmagnitude_range[0])
+            & (FAKE_SKY["phot_bp_mean_mag"] < gbpmagnitude_range[1])
+        )
+        tbl = FAKE_SKY[k]
+        tbl["ang_sep"] = ang_sep[k]
+        tbl.sort("ang_sep")
+        return tbl if limit is None else tbl[:limit]
+
+    def query_gaia_fields(ras, decs, radii, **kwargs):
+        queries.append((ras, decs, radii))
+        tbls = []
+        for idx, (ra, dec, radius) in enumerate(zip(ras, decs, radii)):
+            tbl = query_gaia(ra, dec, radius, **kwargs)
+            tbl["field_id"] = idx
+            tbls.append(tbl)
+        del queries[-len(tbls) :]
+        return vstack(tbls)
+
+    monkeypatch.setattr(catalog, "CATALOGPATH", f"{tmp_path}/catalogs/")
+    monkeypatch.setattr(catalog, "query_gaia", query_gaia)
+    monkeypatch.setattr(catalog, "query_gaia_fields", query_gaia_fields)
+    monkeypatch.setattr(catalog, "_BACKEND", catalog.GaiaBackend())
+    catalog.clear_catalog_cache()
+    yield queries
+    catalog.clear_catalog_cache()
+
+
+def test_catalog_cache(fake_gaia, monkeypatch):
+    tbl = catalog.get_raw_catalog(210.8, 54.3, 0.05)
+    assert len(fake_gaia) == 1
+    assert len(os.listdir(catalog.CATALOGPATH)) == 1
+
+    # Tables are read back from disk, including with units
+    tbl2 = catalog.get_raw_catalog(210.8 * u.deg, 54.3 * u.deg, 0.05)
+    assert len(fake_gaia) == 1
+    assert np.all(tbl2["source_id"] == tbl["source_id"])
+    assert np.all(
+        np.ma.getmaskarray(tbl2["teff_gspphot"])
+        == np.ma.getmaskarray(tbl["teff_gspphot"])
+    )
+
+    # A different time propagates the same cached table
+    cat1 = catalog.get_sky_catalog(210.8, 54.3, 0.05, time=Time("2020-01-01"))
+    cat2 = catalog.get_sky_catalog(210.8, 54.3, 0.05, time=Time("2030-01-01"))
+    assert len(fake_gaia) == 1
+    assert np.all(cat1["source_id"] == cat2["source_id"])
+    assert not np.allclose(
+        cat1["coords"].ra.deg, cat2["coords"].ra.deg, rtol=0, atol=1e-8
+    )
+    assert np.all(np.isfinite(cat1["teff"]))
+
+    # Other parameters are new queries, but a limit is cut from the full table
+    assert np.all(
+        catalog.get_raw_catalog(210.8, 54.3, 0.05, limit=3)["source_id"]
+        == tbl["source_id"][:3]
+    )
+    assert len(fake_gaia) == 1
+    catalog.get_raw_catalog(210.8, 54.3, 0.04)
+    assert len(fake_gaia) == 2
+    with pytest.raises(FileNotFoundError):
+        catalog.get_raw_catalog(210.8, 54.3, 0.06, offline=True)
+    assert len(fake_gaia) == 2
+
+    # Offline mode serves old tables, otherwise they are queried again
+    for fname in os.listdir(catalog.CATALOGPATH):
+        os.utime(f"{catalog.CATALOGPATH}{fname}", (0, 0))
+    catalog.get_raw_catalog(210.8, 54.3, 0.05, offline=True)
+    assert len(fake_gaia) == 2
+    catalog.get_raw_catalog(210.8, 54.3, 0.05)
+    assert len(fake_gaia) == 3
+
+    # Old tables are evicted when new tables are written
+    assert len(os.listdir(catalog.CATALOGPATH)) == 1
+    assert catalog.evict_catalog_cache() == 0
+    catalog.get_raw_catalog(210.8, 54.3, 0.04)
+    assert catalog.evict_catalog_cache(max_size=0) == 2
+    assert catalog.clear_catalog_cache() == 0
+
+    # Tables evicted by another process are treated as not cached
+    remove, utime = os.remove, os.utime
+
+    def race(func):
+        def wrapper(path, *args, **kwargs):
+            remove(path)
+            return func(path, *args, **kwargs)
+
+        return wrapper
+
+    catalog.get_raw_catalog(210.8, 54.3, 0.05)
+    monkeypatch.setattr(os, "utime", race(utime))
+    catalog.get_raw_catalog(210.8, 54.3, 0.05)
+    assert len(fake_gaia) == 6
+    monkeypatch.setattr(os, "utime", utime)
+    monkeypatch.setattr(os, "remove", race(remove))
+    assert catalog.clear_catalog_cache() == 0
+    assert len(os.listdir(catalog.CATALOGPATH)) == 0
+
+
+def test_sky_catalog_memory_cache(fake_gaia):
+    # Extra keys can be lists or tuples, and default to the current time
+    cat = catalog.get_sky_catalog(210.8, 54.3, 0.05, gaia_keys=["j_msigcom"])
+    assert "j_msigcom" in cat
+    before = Time.now()
+    cat = catalog.get_sky_catalog(
+        210.8 * u.deg, 54.3 * u.deg, 0.05, gaia_keys=("j_msigcom",)
+    )
+    assert cat["coords"].obstime >= before
+    assert len(fake_gaia) == 1
+
+    # Recent tables are read from memory
+    catalog.evict_catalog_cache(max_size=0)
+    catalog.get_sky_catalog(210.8, 54.3, 0.05, gaia_keys=["j_msigcom"])
+    assert len(fake_gaia) == 1
+    assert catalog._get_cached_catalog.cache_info().maxsize is not None
+
+
+def test_sky_catalogs(fake_gaia):
+    ras = 210.8 + np.arange(10) * 0.1
+    decs = np.full(10, 54.3)
+    decs[-1] = 70
+    catalog.get_sky_catalog(ras[3], decs[3], 0.1)
+    assert len(fake_gaia) == 1
+
+    # Every field that is not cached is queried in one job
+    cats = catalog.get_sky_catalogs(ras, decs, 0.1, limit=10)
+    assert len(fake_gaia) == 2
+    assert len(fake_gaia[-1][0]) == 9
+    assert cats[-1] is None
+    for ra, dec, cat in zip(ras[:-1], decs[:-1], cats[:-1]):
+        single = catalog.get_sky_catalog(ra, dec, 0.1, limit=10)
+        assert np.all(single["source_id"] == cat["source_id"])
+        assert len(cat["source_id"]) == 10
+    assert len(fake_gaia) == 2
+
+    # Fields are split into batches
+    catalog.get_sky_catalogs(ras + 1, decs, 0.1, batch_size=4)
+    assert [len(query[0]) for query in fake_gaia[2:]] == [4, 4, 2]
+    with pytest.raises(FileNotFoundError):
+        catalog.get_raw_catalogs(ras + 2, decs, 0.1, offline=True)
+
+
+def test_sky_tiles():
+    tiles = catalog.sky_tiles(210.8, 54.3, 0.155)
+    assert 1 < len(tiles) <= 4
+    # Tiles wrap around RA = 0
+    ncells = catalog._tile_cells(0.5, catalog.sky_tiles(0.1, 10, 0.2)[0][0])
+    cells = [cell for _, cell in catalog.sky_tiles(0.1, 10, 0.2)]
+    assert 0 in cells and (ncells - 1) in cells
+    # Cones around the pole use every tile in the polar bands
+    assert len(catalog.sky_tiles(0, 89.6, 0.5)) == catalog._tile_cells(
+        0.5, 358
+    ) + catalog._tile_cells(0.5, 359)
+
+
+def test_tiled_catalog(fake_gaia):
+    tbl = catalog.get_tiled_catalog(210.8, 54.3, 0.155, epoch=2016)
+    ntiles = len(fake_gaia)
+    assert ntiles == len(catalog.sky_tiles(210.8, 54.3, 0.155))
+    direct = catalog.query_gaia(210.8, 54.3, 0.155)
+    assert np.all(tbl["source_id"] == direct["source_id"])
+    assert np.allclose(tbl["ang_sep"], direct["ang_sep"])
+
+    # Slightly shifted fields only query the tiles that are missing
+    tiles = set()
+    for offset in np.linspace(0, 0.3, 7):
+        catalog.get_tiled_catalog(210.8 + offset, 54.3, 0.155)
+        tiles |= set(catalog.sky_tiles(210.8 + offset, 54.3, 0.155))
+    assert len(fake_gaia) == len(tiles) + 1
+    assert len(tiles) < 7
+
+    # The limit keeps the closest stars
+    cat = catalog.get_sky_catalog(210.8, 54.3, 0.155, limit=5, tiled=True)
+    assert len(cat["source_id"]) == 5
+    assert np.all(np.diff(cat["ang_sep"]) >= 0)
+
+    # Stars that move into the cone from a tile outside it are found at
+    # other epochs. This star is across the edge of a band of tiles in 2016.
+    sky = vstack([FAKE_SKY, FAKE_SKY[:1]])
+    sky["source_id"][-1], sky["ra"][-1], sky["dec"][-1] = 1, 210.8, 54.5005
+    sky["pmra"][-1], sky["pmdec"][-1] = 0, 1000
+    catalog.set_catalog_backend(catalog.FileBackend(sky))
+    catalog.clear_catalog_cache()
+    for epoch in [2000, 2016]:
+        tbl = catalog.get_tiled_catalog(210.8, 54.3, 0.199, epoch=epoch)
+        direct = catalog.get_catalog_backend().query(
+            210.8, 54.3, 0.199, epoch=epoch
+        )
+        assert set(tbl["source_id"]) == set(direct["source_id"])
+        assert (1 in tbl["source_id"]) == (epoch == 2000)
+
+
+def test_fetch_sky_catalogs(fake_gaia, monkeypatch):
+    query_gaia = catalog.query_gaia
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0, "failures": 0}
+
+    def flaky_query_gaia(*args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+            fail = state["failures"] < 3
+            state["failures"] += fail
+        try:
+            time.sleep(0.05)
+            if fail:
+                raise ConnectionError("Archive is down")
+            return query_gaia(*args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(catalog, "query_gaia", flaky_query_gaia)
+    ras = 210.8 + np.arange(8) * 0.1
+    results = dict(
+        catalog.iter_sky_catalogs(
+            ras, 54.3, 0.1, max_workers=2, backoff=0, timeout=60
+        )
+    )
+    assert sorted(results) == list(range(8))
+    assert state["max_running"] == 2
+    assert state["failures"] == 3
+    for idx, ra in enumerate(ras):
+        cat = catalog.get_sky_catalog(ra, 54.3, 0.1)
+        assert np.all(cat["source_id"] == results[idx]["source_id"])
+
+    # Failures are raised once the retries are used up
+    state["failures"] = -10
+    futures = catalog.fetch_sky_catalogs([10], 54.3, retries=2, backoff=0)
+    with pytest.raises(ConnectionError):
+        futures[0].result(timeout=60)
+
+    # Slow fields time out
+    state["failures"] = 3
+    with pytest.raises(concurrent.futures.TimeoutError):
+        list(catalog.iter_sky_catalogs([20, 30], 54.3, timeout=0.01))
+
+
+def test_propagate_positions():
+    tbl = FAKE_SKY[:500]
+    ra, dec = np.asarray(tbl["ra"]), np.asarray(tbl["dec"])
+    pmra, pmdec = np.asarray(tbl["pmra"]), np.asarray(tbl["pmdec"])
+    plx = np.asarray(tbl["parallax"])
+    rv = np.asarray(tbl["radial_velocity"].filled(0))
+    times = Time(["2000-01-01", "2026-06-01", "2040-01-01"])
+    new_ra, new_dec = catalog.propagate_positions(
+        ra, dec, pmra, pmdec, times, parallax=plx, radial_velocity=rv
+    )
+    assert new_ra.shape == (3, 500)
+
+    coords = SkyCoord(
+        ra=ra * u.deg,
+        dec=dec * u.deg,
+        pm_ra_cosdec=pmra * u.mas / u.year,
+        pm_dec=pmdec * u.mas / u.year,
+        distance=Distance(parallax=plx * u.mas),
+        radial_velocity=rv * u.km / u.s,
+        obstime=Time(2016, format="jyear"),
+    )
+    for idx, t in enumerate(times):
+        expected = coords.apply_space_motion(t)
+        sep = catalog._angular_separation(
+            new_ra[idx], new_dec[idx], expected.ra.deg, expected.dec.deg
+        )
+        assert sep.max() * 3.6e6 < 0.1
+
+    # Linear propagation is close over short times
+    lin_ra, lin_dec = catalog.propagate_positions(
+        ra, dec, pmra, pmdec, [2016, 2017], method="linear"
+    )
+    assert np.allclose(lin_ra[0], ra) and np.allclose(lin_dec[0], dec)
+    assert np.allclose(lin_dec[1], dec + pmdec / 3.6e6)
+    ra_2017, dec_2017 = catalog.propagate_positions(ra, dec, pmra, pmdec, 2017)
+    sep = catalog._angular_separation(lin_ra[1], lin_dec[1], ra_2017, dec_2017)
+    assert sep.max() * 3.6e6 < 1
+    with pytest.raises(ValueError):
+        catalog.propagate_positions(ra, dec, pmra, pmdec, 2017, method="bad")
+
+
+def test_columnar_catalog(fake_gaia, tmp_path):
+    cat = catalog.get_sky_catalog(
+        210.8, 54.3, 0.2, gaia_keys=["j_msigcom"], as_catalog=True
+    )
+    assert isinstance(cat, catalog.Catalog)
+    assert cat.data.dtype["source_id"] == np.int64
+    assert "j_msigcom" in cat.columns
+    assert cat["ra"].unit == u.deg
+    assert cat["jmag"].dtype == float
+
+    # Columns and slices are views of the same data
+    assert np.shares_memory(cat["jmag"], cat.data)
+    assert np.shares_memory(cat[2:10].data, cat.data)
+    assert len(cat[3]) == 1 and len(cat[-1]) == 1
+    bright = cat.cut_magnitude("jmag", faintest=12)
+    assert len(bright) < len(cat)
+    assert np.all(bright["jmag"] <= 12)
+    near = cat.cut_cone(210.8, 54.3, 0.1)
+    assert 0 < len(near) < len(cat)
+    assert np.all(near["ang_sep"] < 0.1 * u.deg + 1 * u.arcsec)
+
+    # The dictionary format is the same as get_sky_catalog
+    t = Time("2026-01-01")
+    d1 = catalog.get_sky_catalog(
+        210.8, 54.3, 0.2, gaia_keys=["j_msigcom"], time=t
+    )
+    d2 = cat.to_dict(time=t)
+    assert set(d1) == set(d2)
+    assert np.all(d1["source_id"] == d2["source_id"])
+    assert np.allclose(d1["coords"].ra, d2["coords"].ra)
+    ra, dec = cat.positions(t)
+    assert np.allclose(ra[0], d1["coords"].ra.deg)
+
+    # Catalogs are saved to Parquet with their units
+    cat.write(f"{tmp_path}/cat.parquet")
+    cat2 = catalog.Catalog.read(f"{tmp_path}/cat.parquet")
+    assert cat2.columns == cat.columns
+    assert cat2.units == cat.units
+    assert cat2.ref_epoch == cat.ref_epoch
+    assert np.all(cat2.data == cat.data)
+
+
+def test_file_backend(fake_gaia, tmp_path):
+    path = f"{tmp_path}/sky.parquet"
+    FAKE_SKY.write(path, format="parquet")
+    previous = catalog.set_catalog_backend(path)
+    try:
+        backend = catalog.get_catalog_backend()
+        assert isinstance(backend, catalog.FileBackend)
+        assert isinstance(previous, catalog.GaiaBackend)
+
+        # Queries select the same stars as a search of the whole table
+        tbl = backend.query(210.8, 54.3, 0.2, epoch=2000)
+        ra, dec = catalog.propagate_positions(
+            FAKE_SKY["ra"],
+            FAKE_SKY["dec"],
+            FAKE_SKY["pmra"],
+            FAKE_SKY["pmdec"],
+            [2000],
+            parallax=FAKE_SKY["parallax"],
+            radial_velocity=FAKE_SKY["radial_velocity"].filled(0),
+        )
+        k = catalog._angular_separation(210.8, 54.3, ra[0], dec[0]) < 0.2
+        assert set(tbl["source_id"]) == set(FAKE_SKY["source_id"][k])
+        assert np.all(np.diff(tbl["ang_sep"]) >= 0)
+        assert np.all(tbl["phot_bp_mean_mag"] < 20)
+        assert np.all(
+            backend.query(210.8, 54.3, 0.2, limit=5)["source_id"]
+            == tbl["source_id"][:5]
+        )
+        faint = backend.query(210.8, 54.3, 0.2, gbpmagnitude_range=(15, 20))
+        assert 0 < len(faint) < len(tbl)
+        assert np.all(faint["phot_bp_mean_mag"] > 15)
+        with pytest.raises(ValueError):
+            backend.query(210.8, 54.3, 0.2, gaia_keys=("not_a_column",))
+
+        # Catalogs are made from the local table, without a cache on disk
+        cat = catalog.get_sky_catalog(210.8, 54.3, 0.2, as_catalog=True)
+        assert np.all(cat["source_id"] == tbl["source_id"])
+        cats = catalog.get_sky_catalogs([210.8, 211.0], [54.3, 54.5], 0.2)
+        assert np.all(
+            cats[0]["source_id"]
+            == catalog.get_sky_catalog(210.8, 54.3, 0.2)["source_id"]
+        )
+        cat = catalog.get_sky_catalog(211.0, 54.5, 0.1, tiled=True)
+        assert len(cat["source_id"]) > 0
+        assert len(fake_gaia) == 0
+        assert not os.path.isdir(catalog.CATALOGPATH)
+    finally:
+        catalog.set_catalog_backend(previous)
+    assert catalog.get_catalog_backend() is previous
+    with pytest.raises(ValueError):
+        catalog.FileBackend(FAKE_SKY["ra", "dec"])
@@ -2,11 +2,15 @@
 import astropy.units as u
 import matplotlib.pyplot as plt
 import numpy as np
+import pytest
+from astropy.coordinates import SkyCoord
 from astropy.wcs import WCS, Sip
 
 # First-party/Local
 from pandorasat import DOCSDIR, PANDORASTYLE, PandoraSat
+from pandorasat.detectormixins import reference_property
 from pandorasat.irdetector import NIRDetector
+from pandorasat.phoenix import load_benchmark
 from pandorasat.visibledetector import VisibleDetector
 
 
@@ -132,3 +136,208 @@ def test_wcs():
     assert np.allclose(
         wcs.wcs.crval, wcs.all_pix2world(wcs.wcs.crpix[None, :], origin)[0]
     )
+
+
+def test_project_catalog():
+    rng = np.random.default_rng(3)
+    stars = SkyCoord(
+        300 + rng.uniform(-1, 1, 3000) / np.cos(np.deg2rad(10)),
+        10 + rng.uniform(-1, 1, 3000),
+        unit="deg",
+    )
+    ra, dec, theta = [300, 300.1, 299.8], [10, 10.2, 9.9], [0, 30, 250]
+    for detector in [VisibleDetector(), NIRDetector()]:
+        pointing_idx, star_idx, row, column = detector.project_catalog(
+            stars, ra, dec, theta
+        )
+        assert len(pointing_idx) > 0
+        assert np.all((row >= -0.5) & (row < detector.shape[0] - 0.5))
+        assert np.all((column >= -0.5) & (column < detector.shape[1] - 0.5))
+        # Stars land on the same pixels as with the WCS of each pointing
+        for idx in range(len(ra)):
+            wcs = detector.get_wcs(ra[idx], dec[idx], theta[idx])
+            k = pointing_idx == idx
+            x, y = wcs.world_to_pixel(stars[star_idx[k]])
+            assert np.allclose(column[k], x, atol=1e-4)
+            assert np.allclose(row[k], y, atol=1e-4)
+            x, y = wcs.world_to_pixel(
+                stars[np.isin(np.arange(len(stars)), star_idx[k], invert=True)]
+            )
+            assert not np.any(
+                (x > 0)
+                & (x < detector.shape[1] - 1)
+                & (y > 0)
+                & (y < detector.shape[0] - 1)
+            )
+
+    pointing_idx, star_idx, row, column = NIRDetector().project_catalog(
+        stars, ra, dec, theta, subarray=True
+    )
+    assert np.all((row >= -0.5) & (row < 399.5))
+    assert np.all((column >= -0.5) & (column < 79.5))
+    with pytest.raises(ValueError):
+        VisibleDetector().project_catalog(stars, ra, dec, subarray=True)
+
+
+def test_magnitude_conversion(monkeypatch):
+    for detector in [VisibleDetector(), NIRDetector()]:
+        mag = np.linspace(5, 15, 11)
+        flux = detector.mag_to_flux(mag)
+        assert flux.unit == u.electron / u.second
+        assert np.allclose(detector.flux_to_mag(flux), mag)
+        assert np.allclose(detector.mag_to_flux(mag[3]), flux[3])
+
+        # The bandpass is only integrated again if the reference changes
+        calls = []
+        calibration = type(detector)._photometric_calibration.fget
+
+        def _photometric_calibration(self):
+            calls.append(1)
+            return calibration.__wrapped__(self)
+
+        monkeypatch.setattr(
+            type(detector),
+            "_photometric_calibration",
+            reference_property(_photometric_calibration),
+        )
+        detector.mag_to_flux(mag)
+        detector.flux_to_mag(flux)
+        assert len(calls) == 0
+        detector.reference = type(detector.reference)()
+        assert np.allclose(detector.mag_to_flux(mag), flux)
+        assert len(calls) == 1
+        detector.mag_to_flux(mag)
+        detector.flux_to_mag(flux)
+        assert len(calls) == 1
+
+
+def test_reference_properties(monkeypatch):
+    for detector in [VisibleDetector(), NIRDetector()]:
+        keys = ["zeropoint", "dark", "readnoise", "gain", "bias", "midpoint"]
+        values = {key: getattr(detector, key) for key in keys}
+        calls = []
+        for name in ["get_zeropoint", "get_bias", "get_sensitivity"]:
+            method = getattr(detector.reference, name)
+            monkeypatch.setattr(
+                detector.reference,
+                name,
+                lambda *args, method=method, **kwargs: calls.append(1)
+                or method(*args, **kwargs),
+            )
+        # Values are stored after the first read
+        for key in keys:
+            assert np.all(getattr(detector, key) == values[key])
+        assert len(calls) == 0
+
+        # and read again after a refresh
+        detector.refresh()
+        for key in keys:
+            assert np.all(getattr(detector, key) == values[key])
+        assert len(calls) > 0
+
+
+def test_response_tables():
+    wavelength = np.linspace(0.1, 3.5, 1000) * u.micron
+    for detector in [VisibleDetector(), NIRDetector()]:
+        for name in ["qe", "throughput", "sensitivity"]:
+            value = getattr(detector, name)(wavelength)
+            expected = getattr(detector.reference, f"get_{name}")(
+                wavelength=wavelength
+            )
+            assert value.unit == expected.unit
+            # Tables are interpolated from a fine grid, so match the
+            # reference to a small fraction of the peak response
+            assert np.allclose(
+                value.value,
+                expected.value,
+                rtol=0,
+                atol=1e-3 * expected.value.max(),
+            )
+            # Plain floats are taken as microns, and give plain floats
+            fast = getattr(detector, name)(wavelength.value)
+            assert not isinstance(fast, u.Quantity)
+            assert np.allclose(fast, value.value, rtol=1e-12)
+            assert np.allclose(
+                getattr(detector, name)(wavelength.to(u.AA)), value
+            )
+
+
+def test_integrate_sed():
+    wavelength, flux = load_benchmark()
+    for detector in [VisibleDetector(), NIRDetector()]:
+        rate = detector.integrate_sed(wavelength, flux)
+        assert rate.unit == u.electron / u.second
+        expected = np.trapz(
+            flux * detector.sensitivity(wavelength), wavelength
+        ).to(u.electron / u.second)
+        assert np.isclose(rate, expected)
+
+        # Many spectra are integrated at once, with or without units
+        scale = np.asarray([1, 2, 10])
+        rates = detector.integrate_sed(wavelength, flux * scale[:, None])
+        assert rates.shape == (3,)
+        assert np.allclose(rates, rate * scale)
+        assert np.allclose(
+            detector.integrate_sed(
+                wavelength.to_value(u.micron), flux.value * scale[:, None]
+            ),
+            rates.value,
+        )
+        with pytest.raises(ValueError):
+            detector.integrate_sed(wavelength[::-1], flux[::-1])
+
+    # The benchmark star is 13th magnitude in the Pandora visible band
+    assert np.isclose(
+        VisibleDetector().flux_to_mag(
+            VisibleDetector().integrate_sed(wavelength, flux)
+        ),
+        13,
+        atol=0.05,
+    )
+
+
+def test_wcs_cache():
+    rng = np.random.default_rng(4)
+    stars = SkyCoord(
+        300 + rng.uniform(-0.5, 0.5, 500),
+        10 + rng.uniform(-0.5, 0.5, 500),
+        unit="deg",
+    )
+    ra, dec, theta = [300, 300.1, 299.8], [10, 10.2, 9.9], [0, 30, 250]
+    for detector in [VisibleDetector(), NIRDetector()]:
+        for distortion in [True, False]:
+            # The WCS is the same as from the reference products
+            for idx in range(len(ra)):
+                wcs = detector.get_wcs(
+                    ra[idx], dec[idx], theta[idx], distortion=distortion
+                )
+                expected = detector.reference.get_wcs(
+                    target_ra=ra[idx] * u.deg,
+                    target_dec=dec[idx] * u.deg,
+                    theta=theta[idx] * u.deg,
+                    distortion=distortion,
+                )
+                assert wcs.to_header(relax=True) == expected.to_header(
+                    relax=True
+                )
+            # Each WCS is a copy that can be changed
+            wcs.wcs.crval = [0, 0]
+            assert np.allclose(
+                detector.get_wcs(ra[-1], dec[-1], theta[-1]).wcs.crval,
+                [ra[-1], dec[-1]],
+            )
+
+            # Many pointings at once give the same pixels as each WCS
+            x, y = detector.world_to_pixel(
+                stars, ra, dec, theta, distortion=distortion
+            )
+            assert x.shape == (3, 500)
+            for idx in range(len(ra)):
+                wcs = detector.get_wcs(
+                    ra[idx], dec[idx], theta[idx], distortion=distortion
+                )
+                expected_x, expected_y = wcs.world_to_pixel(stars)
+                assert np.allclose(x[idx], expected_x, atol=1e-4)
+                assert np.allclose(y[idx], expected_y, atol=1e-4)
+        x, y = detector.world_to_pixel(stars[0], ra[0], dec[0])
+        assert x.shape == ()
@@ -0,0 +1,66 @@
+# Standard library
+import subprocess
+import sys
+
+# Third-party
+import pytest
+
+# First-party/Local
+import pandorasat
+
+# Budget for a cold `import pandorasat` in seconds
+IMPORT_TIME_BUDGET = 1.0
+
+
+def test_import_time():
+    """Importing the package should not import the SED, catalog or plotting tools."""
+    script = (
+        "import sys, time; t = time.perf_counter(); import pandorasat; "
+        "print(time.perf_counter() - t); print(' '.join(sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_time, modules = result.stdout.strip().split("\n")[-2:]
+    modules = modules.split(" ")
+    for module in [
+        "synphot",
+        "stsynphot",
+        "astroquery",
+        "matplotlib",
+        "pandas",
+        "pandoraref",
+    ]:
+        assert module not in modules
+    assert float(import_time) < IMPORT_TIME_BUDGET
+
+
+def test_utils_without_astroquery():
+    """The photon and color tools should not import the catalog tools."""
+    script = (
+        "import sys, pandorasat; from pandorasat import utils; "
+        "pandorasat.photon_energy(1.0); utils.wavelength_to_rgb(500); "
+        "print('astroquery' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().split("\n")[-1] == "False"
+
+
+def test_lazy_attributes():
+    # First-party/Local
+    from pandorasat import phoenix, utils
+
+    assert pandorasat.SED is phoenix.SED
+    assert pandorasat.get_sky_catalog is utils.get_sky_catalog
+    assert pandorasat.utils is utils
+    assert "NIRDetector" in dir(pandorasat)
+    with pytest.raises(AttributeError):
+        pandorasat.not_an_attribute
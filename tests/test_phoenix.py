@@ -1,8 +1,14 @@
 # Standard library
+import functools
+import json
 import os
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
 # First-party/Local
-from pandorasat import logger, phoenix
+from pandorasat import bundle, logger, phoenix
 
 PHOENIXPATH = phoenix.PHOENIXPATH
 os.environ["PYSYN_CDBS"] = PHOENIXPATH
@@ -12,9 +18,107 @@ import astropy.units as u  # noqa: E402
 import numpy as np  # noqa: E402
 import pytest  # noqa: E402
 import stsynphot as stsyn  # noqa: E402
+from astropy.io import fits  # noqa: E402
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files with support for HTTP range requests, like the STScI archive."""
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            return super().do_GET()
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        with open(path, "rb") as f:
+            data = f.read()
+        start = 0
+        if self.headers.get("Range") is not None:
+            start = int(self.headers["Range"].split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def phoenix_server(tmp_path):
+    """Local stand in for the STScI archive, serving files from a directory."""
+    serverpath = f"{tmp_path}/server/"
+    os.makedirs(serverpath)
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(RangeRequestHandler, directory=serverpath),
+    )
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, serverpath, f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_phoenix_grid(tmp_path, monkeypatch):
+    """Writes a small grid in the same format as the STScI PHOENIX grid."""
+    gridpath = f"{tmp_path}/grid/phoenix/phoenixm00/"
+    os.makedirs(gridpath)
+    wavelength = np.linspace(500, 40000, 2000)
+    for teff in [3000, 3100, 3200]:
+        cols = [fits.Column("WAVELENGTH", "D", "ANGSTROMS", array=wavelength)]
+        for logg in [40, 45, 50]:
+            flux = teff * logg * (wavelength / 1e4) ** -2
+            if (teff == 3200) & (logg == 50):
+                flux *= 0
+            cols.append(fits.Column(f"g{logg:02}", "D", "FLAM", array=flux))
+        fits.HDUList(
+            [fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]
+        ).writeto(f"{gridpath}phoenixm00_{teff}.fits")
+    monkeypatch.setattr(phoenix, "PHOENIXPATH", f"{tmp_path}/")
+    monkeypatch.setattr(phoenix, "PHOENIXGRIDPATH", gridpath)
+    phoenix.load_phoenix_cube.cache_clear()
+    phoenix._get_band_weights.cache_clear()
+    yield tmp_path
+    phoenix.load_phoenix_cube.cache_clear()
+    phoenix._get_band_weights.cache_clear()
+    phoenix.disable_sed_cache()
+    phoenix._restore_synphot()
+
+
+@pytest.fixture
+def fake_johnson_bands(fake_phoenix_grid, monkeypatch):
+    """Replaces the Johnson bands and Vega, which need the synphot data files."""
+    # Third-party
+    from synphot import SpectralElement
+    from synphot.models import Box1D
+
+    def band(obsmode):
+        x_0 = 12500 if obsmode.endswith("j") else 5500
+        return SpectralElement(Box1D, amplitude=1, x_0=x_0, width=2000)
+
+    wavelength = np.linspace(900, 30000, 5000)
+    os.makedirs(f"{fake_phoenix_grid}/calspec")
+    cols = [
+        fits.Column("WAVELENGTH", "D", "ANGSTROMS", array=wavelength),
+        fits.Column(
+            "FLUX", "D", "FLAM", array=1e-9 * (wavelength / 5500) ** -3
+        ),
+    ]
+    fits.HDUList(
+        [fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]
+    ).writeto(f"{fake_phoenix_grid}/calspec/alpha_lyr_stis_011.fits")
+    monkeypatch.setattr(stsyn, "band", band)
 
 
-# testing get_vega
 def test_get_vega():
     logger.setLevel("DEBUG")
     phoenix.download_vega()
@@ -86,7 +190,7 @@ def test_out_of_grid_T():
         pytest.skip(
             "Skipping this test on GitHub Actions this downloads a database of stellar models."
         )
-    with pytest.raises(UnboundLocalError):
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
         wavelength, sed = phoenix.get_phoenix_model(teff=10000, jmag=9)
 
 
@@ -130,3 +234,409 @@ def test_get_benchmark():
         u.Quantity(sed, u.erg / (u.AA * u.s * u.cm**2))
     except u.UnitConversionError:
         pytest.fail("Incorrect units")
+
+    # The benchmark is read once, and returned as read-only views
+    wavelength2, sed2 = phoenix.load_benchmark()
+    assert np.shares_memory(sed, sed2)
+    assert not sed.flags.writeable
+    assert np.allclose(
+        wavelength.value,
+        np.loadtxt(f"{phoenix.PACKAGEDIR}/data/benchmark.csv", delimiter=",")[
+            :, 0
+        ],
+    )
+
+
+def test_vega_sidecar(fake_johnson_bands, fake_phoenix_grid):
+    fname = f"{fake_phoenix_grid}/calspec/alpha_lyr_stis_011"
+    wavelength, vega = phoenix.load_vega()
+    assert os.path.isfile(f"{fname}.npy")
+    assert not vega.flags.writeable
+    assert np.shares_memory(vega, phoenix.load_vega()[1])
+    assert np.allclose(
+        vega.value, 1e-9 * (wavelength.to(u.AA).value / 5500) ** -3
+    )
+
+    # A new process reads the sidecar instead of the FITS file
+    phoenix._load_vega_data.cache_clear()
+    os.utime(f"{fname}.fits", (0, 0))
+    np.save(f"{fname}.npy", np.vstack([wavelength.value, vega.value * 2]))
+    assert np.allclose(phoenix.load_vega()[1], vega * 2)
+    phoenix._load_vega_data.cache_clear()
+
+
+def test_phoenix_cube(fake_phoenix_grid):
+    phoenix.build_phoenix_cube()
+    teff, logg, wavelength, valid, flux = phoenix.load_phoenix_cube()
+    assert np.allclose(teff, [3000, 3100, 3200])
+    assert np.allclose(logg, [4.0, 4.5, 5.0])
+    assert flux.shape == (3, 3, len(wavelength))
+    assert isinstance(flux, np.memmap)
+    assert np.all((wavelength >= 1000) & (wavelength <= 30000))
+    assert valid.sum() == 8
+
+    wavelength, flux = phoenix.interpolate_phoenix_cube(3050, 4.25)
+    model = (wavelength / 1e4) ** -2
+    assert np.allclose(flux, (3000 + 3100) * (40 + 45) / 4 * model)
+    wavelength, flux = phoenix.interpolate_phoenix_cube(3100, 4.5)
+    assert np.allclose(flux, 3100 * 45 * model)
+    # Grid edges are valid, and the zero flux grid point is not
+    phoenix.interpolate_phoenix_cube(3200, 4.5)
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
+        phoenix.interpolate_phoenix_cube(3150, 4.75)
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
+        phoenix.interpolate_phoenix_cube(3300, 4.5)
+
+
+def test_sed_batch(fake_phoenix_grid, fake_johnson_bands):
+    phoenix.build_phoenix_cube()
+    teff = np.asarray([3000, 3050, 3175])
+    logg = np.asarray([4.5, np.nan, 4.1])
+    jmag = np.asarray([9, 10, 11.5])
+    wavelength, sed = phoenix.SED_batch(teff, logg, jmag=jmag)
+    assert sed.shape == (3, len(wavelength))
+    assert sed.unit == u.erg / (u.AA * u.s * u.cm**2)
+    for idx in range(3):
+        wav, sed1 = phoenix.SED(teff[idx], logg[idx], jmag=jmag[idx])
+        assert np.allclose(wav, wavelength)
+        assert np.allclose(sed1, sed[idx])
+
+    wavelength, sed = phoenix.SED_batch(teff, 4.5, vmag=12)
+    assert sed.shape == (3, len(wavelength))
+    with pytest.raises(ValueError):
+        phoenix.SED_batch(teff, 4.5)
+
+    # Stars with no PHOENIX data can be returned as NaN without failing
+    # the batch. (3190, 4.9) touches a grid point with no spectrum.
+    teff = np.asarray([3000, np.nan, 3050, 5000, 3190, 3175])
+    logg = np.asarray([4.5, 4.5, 3.0, 4.5, 4.9, 4.1])
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
+        phoenix.SED_batch(teff, logg, jmag=9)
+    with pytest.raises(ValueError):
+        phoenix.SED_batch(teff, logg, jmag=9, errors="ignore")
+    grid = np.linspace(0.1, 3, 50)
+    for kwargs in [{}, {"wavelength": grid}]:
+        wavelength, sed = phoenix.SED_batch(
+            teff, logg, jmag=9, errors="nan", **kwargs
+        )
+        bad = np.isnan(sed.value).all(axis=1)
+        assert np.all(bad == [False, True, True, True, True, False])
+        assert not np.isnan(sed.value[~bad]).any()
+        assert np.allclose(
+            sed[~bad],
+            phoenix.SED_batch(teff[~bad], logg[~bad], jmag=9, **kwargs)[1],
+        )
+
+
+def test_rebin():
+    # Ten old bins fall in each new bin, so the flux integral is exact
+    wavelength = np.arange(0.5, 100)
+    flux = np.random.default_rng(42).uniform(1, 2, size=(2, 100))
+    new_wavelength = np.arange(10, 91, 10.0)
+    matrix = phoenix.rebin_matrix(wavelength, new_wavelength)
+    assert matrix.shape == (9, 100)
+    assert matrix.nnz == 90
+    new_flux = phoenix.rebin_spectrum(
+        wavelength * u.AA, flux * u.erg, new_wavelength * u.AA
+    )
+    assert new_flux.shape == (2, 9)
+    assert new_flux.unit == u.erg
+    assert np.allclose(
+        (new_flux.value * 10).sum(axis=1), flux[:, 5:95].sum(axis=1)
+    )
+    assert np.allclose(
+        phoenix.rebin_spectrum(wavelength, np.ones(100), [0, 50, 100]),
+        [0.5, 1, 0.5],
+    )
+    with pytest.raises(ValueError):
+        phoenix.rebin_matrix(wavelength, [3, 2, 1])
+
+    # Grids without units are in microns, as in `SED`
+    assert np.allclose(
+        phoenix.rebin_spectrum(wavelength * u.AA, flux, new_wavelength * 1e-4),
+        new_flux.value,
+    )
+    assert np.allclose(
+        phoenix.rebin_spectrum(wavelength * 1e-4, flux, new_wavelength * u.AA),
+        new_flux.value,
+    )
+
+
+def test_sed_on_detector_grid(fake_phoenix_grid, fake_johnson_bands):
+    # First-party/Local
+    from pandorasat import NIRDetector
+
+    phoenix.build_phoenix_cube()
+    grid = NIRDetector().wavelength_grid
+    assert np.all(np.diff(grid) > 0)
+    wavelength, sed = phoenix.SED(3050, 4.5, jmag=9, wavelength=grid)
+    assert np.allclose(wavelength, grid)
+    assert wavelength.unit == u.AA
+    wavelength, seds = phoenix.SED_batch(
+        [3050, 3050], 4.5, jmag=9, wavelength=grid
+    )
+    assert seds.shape == (2, len(grid))
+    assert np.allclose(seds[0], sed)
+    assert np.allclose(
+        sed, phoenix.rebin_spectrum(*phoenix.SED(3050, 4.5, jmag=9), grid)
+    )
+    # Grids without units are in microns
+    wavelength, sed2 = phoenix.SED(
+        3050, 4.5, jmag=9, wavelength=grid.to_value(u.micron)
+    )
+    assert np.allclose(wavelength, grid)
+    assert np.allclose(sed2, sed)
+    assert np.all(sed2.value > 0)
+
+
+def test_normalization(fake_phoenix_grid, fake_johnson_bands, monkeypatch):
+    # Third-party
+    from synphot import SourceSpectrum
+    from synphot import units as su
+    from synphot.models import Empirical1D
+
+    phoenix.build_phoenix_cube()
+    wavelength, flux = phoenix.interpolate_phoenix_cube(3050, 4.3)
+    vega = SourceSpectrum.from_file(
+        f"{fake_phoenix_grid}/calspec/alpha_lyr_stis_011.fits"
+    )
+    for band, kwargs in [
+        ("johnson,j", {"jmag": 9}),
+        ("johnson,v", {"vmag": 9}),
+    ]:
+        star = SourceSpectrum(
+            Empirical1D, points=wavelength, lookup_table=flux * su.FLAM
+        ).normalize(9 * su.VEGAMAG, band=stsyn.band(band), vegaspec=vega)
+        wav, sed = phoenix.SED(3050, 4.3, **kwargs)
+        assert np.allclose(
+            sed.value, star(wavelength, flux_unit="flam").value, rtol=1e-3
+        )
+
+    # Band integrals are persisted, and do not need stsynphot once saved
+    assert os.path.isfile(f"{fake_phoenix_grid}/normalization_johnson_j.npz")
+    phoenix._get_band_weights.cache_clear()
+    monkeypatch.setattr(stsyn, "band", None)
+    wav, sed2 = phoenix.SED(3050, 4.3, vmag=9)
+    assert np.allclose(sed, sed2)
+
+
+def test_download_file_resume(phoenix_server, tmp_path):
+    server, serverpath, url = phoenix_server
+    data = np.random.default_rng(0).bytes(3 * 2**20)
+    with open(f"{serverpath}file.fits", "wb") as f:
+        f.write(data)
+    with open(f"{tmp_path}/file.fits.part", "wb") as f:
+        f.write(data[: 2**20])
+    size = phoenix.download_file(f"{url}file.fits", f"{tmp_path}/file.fits")
+    assert size == len(data)
+    assert server.requests == [("/file.fits", f"bytes={2**20}-")]
+    assert not os.path.isfile(f"{tmp_path}/file.fits.part")
+    with open(f"{tmp_path}/file.fits", "rb") as f:
+        assert f.read() == data
+
+    # Complete partial files are kept, and larger ones are downloaded again
+    for part in [data, data + b"corrupted"]:
+        server.requests.clear()
+        with open(f"{tmp_path}/file.fits.part", "wb") as f:
+            f.write(part)
+        size = phoenix.download_file(
+            f"{url}file.fits", f"{tmp_path}/file.fits"
+        )
+        assert size == len(data)
+        with open(f"{tmp_path}/file.fits", "rb") as f:
+            assert f.read() == data
+    assert server.requests == [
+        ("/file.fits", f"bytes={len(data) + 9}-"),
+        ("/file.fits", None),
+    ]
+
+
+def test_download_phoenix_grid(phoenix_server, tmp_path, monkeypatch):
+    server, serverpath, url = phoenix_server
+    os.makedirs(f"{serverpath}phoenixm00")
+    filenames = [f"phoenixm00_{teff}.fits" for teff in [3000, 3100, 10000]]
+    links = "".join(
+        [f'<li>&#x1f4c4; <a href="{name}">{name}</a>' for name in filenames]
+    )
+    with open(f"{serverpath}phoenixm00/index.html", "w") as f:
+        f.write(f'<ul><li>&#x1f4c4; <a href="../catalog.fits">x</a>{links}')
+    for name in filenames + ["../catalog.fits", "../vega.fits"]:
+        with open(f"{serverpath}phoenixm00/{name}", "wb") as f:
+            f.write(np.random.default_rng(0).bytes(10000))
+
+    localpath = f"{tmp_path}/local/"
+    monkeypatch.setattr(phoenix, "PHOENIXPATH", localpath)
+    monkeypatch.setattr(
+        phoenix, "PHOENIXGRIDPATH", f"{localpath}grid/phoenix/phoenixm00/"
+    )
+    monkeypatch.setattr(phoenix, "PHOENIXURL", url)
+    monkeypatch.setattr(phoenix, "VEGAURL", f"{url}vega.fits")
+    # Skips the synphot throughput tables
+    os.makedirs(f"{localpath}mtab")
+
+    assert phoenix.check_phoenix_manifest() is None
+    phoenix.download_phoenix_grid(max_workers=2)
+    # Models hotter than 10000K are not downloaded
+    assert sorted(os.listdir(f"{localpath}grid/phoenix/phoenixm00/")) == [
+        "phoenixm00_3000.fits",
+        "phoenixm00_3100.fits",
+    ]
+    assert phoenix.check_phoenix_manifest(checksum=True) == []
+
+    # Damaged files are found and downloaded again, the rest are kept
+    fname = f"{localpath}grid/phoenix/phoenixm00/phoenixm00_3100.fits"
+    with open(fname, "r+b") as f:
+        f.write(b"corrupted")
+    assert phoenix.check_phoenix_manifest() == []
+    assert phoenix.check_phoenix_manifest(checksum=True) == [
+        "grid/phoenix/phoenixm00/phoenixm00_3100.fits"
+    ]
+    server.requests.clear()
+    phoenix.download_phoenix_grid()
+    assert server.requests == [("/phoenixm00/phoenixm00_3100.fits", None)]
+    assert phoenix.check_phoenix_manifest(checksum=True) == []
+
+
+def test_configure_synphot(fake_phoenix_grid, fake_johnson_bands, monkeypatch):
+    # Third-party
+    import synphot
+
+    phoenix.build_phoenix_cube()
+    environ = os.environ.copy()
+    teff = np.linspace(3000, 3200, 20)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        seds = list(
+            executor.map(lambda t: phoenix.SED(t, 4.2, jmag=9)[1], teff)
+        )
+    assert np.allclose(seds, phoenix.SED_batch(teff, 4.2, jmag=9)[1])
+    assert os.environ == environ
+    assert stsyn.conf.rootdir == phoenix.PHOENIXPATH
+    assert synphot.conf.vega_file == (
+        f"{fake_phoenix_grid}/calspec/alpha_lyr_stis_011.fits"
+    )
+
+    # The configuration follows the cache directory when it changes back
+    path = phoenix.PHOENIXPATH
+    monkeypatch.setattr(phoenix, "PHOENIXPATH", f"{fake_phoenix_grid}/other/")
+    phoenix.configure_synphot()
+    assert stsyn.conf.rootdir == f"{fake_phoenix_grid}/other/"
+    monkeypatch.setattr(phoenix, "PHOENIXPATH", path)
+    phoenix.configure_synphot()
+    assert stsyn.conf.rootdir == path
+    assert synphot.conf.vega_file == (
+        f"{fake_phoenix_grid}/calspec/alpha_lyr_stis_011.fits"
+    )
+
+    # Settings from before the first configuration are restored
+    defaults = phoenix._SYNPHOT_STATE["defaults"]
+    phoenix._restore_synphot()
+    assert stsyn.conf.rootdir == defaults["rootdir"]
+    assert synphot.conf.vega_file == defaults["synphot"]["vega_file"]
+
+
+def test_sed_cache(fake_phoenix_grid, fake_johnson_bands):
+    phoenix.build_phoenix_cube()
+    wavelength, sed = phoenix.SED_batch([3000, 3100], 4.5, jmag=9)
+
+    cache = phoenix.enable_sed_cache(teff_tolerance=50, logg_tolerance=0.5)
+    assert phoenix.get_sed_cache() is cache
+    wavelength, sed1 = phoenix.SED_batch([3000, 3010, 3040, 3100], 4.5, jmag=9)
+    assert cache.stats["misses"] == 3
+    assert cache.stats["hits"] == 1
+    assert cache.stats["entries"] == 3
+    assert np.allclose(sed1[[0, 3]], sed)
+    assert np.allclose(sed1[0], sed1[1])
+    # Normalization is applied after the cache, to a different magnitude
+    wavelength, sed2 = phoenix.SED(3010, 4.6, jmag=10)
+    assert np.allclose(sed2, sed1[0] * 10**-0.4)
+    assert cache.stats["hits"] == 2
+
+    # Spectra are evicted once the cache is over its memory limit
+    cache.max_memory = 2.5 * sed1[0].value.nbytes / 2**20
+    phoenix.SED(3150, 4.5, jmag=9)
+    assert cache.stats["entries"] == 2
+    assert cache.stats["evictions"] == 2
+    cache.clear()
+    assert cache.stats["entries"] == 0
+
+    phoenix.disable_sed_cache()
+    assert phoenix.get_sed_cache() is None
+
+
+def test_sed_cache_grid_edges(fake_phoenix_grid):
+    phoenix.build_phoenix_cube()
+    # Tolerances that do not divide the grid spacing round edge stars off the
+    # grid, and the (3200, 5.0) grid point has no spectrum
+    cache = phoenix.SEDCache(teff_tolerance=40, logg_tolerance=0.3)
+    teff = np.asarray([3000, 3200, 3000, 3100])
+    logg = np.asarray([4.0, 4.5, 5.0, 4.7])
+    assert np.allclose(cache.quantize(3200, 4.5), (3200, 4.5))
+    assert np.allclose(cache.quantize(3000, 4.0), (3000, 4.0))
+    assert np.allclose(cache.quantize(3000, 5.0), (3000, 5.0))
+    # Rounds into a cell with no valid data, so is interpolated exactly
+    assert np.allclose(cache.quantize(3100, 4.7), (3100, 4.7))
+    assert np.allclose(cache.quantize(3050, 4.7), (3040, 4.8))
+    flux = cache.get(teff, logg)
+    assert np.allclose(flux, phoenix.interpolate_phoenix_cube(teff, logg)[1])
+    assert np.allclose(cache.get(3200, 4.5), flux[1])
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
+        cache.get(3210, 4.5)
+    with pytest.raises(stsyn.exceptions.ParameterOutOfBounds):
+        cache.get(3190, 4.9)
+
+
+def test_phoenix_bundle(fake_phoenix_grid, fake_johnson_bands, monkeypatch):
+    phoenix.build_phoenix_cube()
+    cache = phoenix.enable_sed_cache()
+    wavelength, sed = phoenix.SED(3050, 4.3, jmag=9)
+    bundle.main(["export", f"{fake_phoenix_grid}/bundle.tar.gz"])
+
+    # Import onto a "machine" with no grid, throughput tables or internet
+    localpath = f"{fake_phoenix_grid}/local/"
+    monkeypatch.setattr(phoenix, "PHOENIXPATH", localpath)
+    monkeypatch.setattr(
+        phoenix, "PHOENIXGRIDPATH", f"{localpath}grid/phoenix/phoenixm00/"
+    )
+    monkeypatch.setattr(stsyn, "band", None)
+    monkeypatch.setattr(phoenix, "download_file", None)
+    bundle.main(["import", f"{fake_phoenix_grid}/bundle.tar.gz"])
+    assert sorted(os.listdir(localpath)) == [
+        "calspec",
+        "normalization_johnson_j.npz",
+        "normalization_johnson_v.npz",
+        "phoenix_cube_axes.npz",
+        "phoenix_cube_flux.npy",
+    ]
+    # Nothing read from the old files is kept
+    assert cache.stats["entries"] == 0
+    assert phoenix._SYNPHOT_STATE["path"] is None
+    assert phoenix._cached_rebin_matrix.cache_info().currsize == 0
+    wavelength, sed2 = phoenix.SED(3050, 4.3, jmag=9)
+    assert np.allclose(sed, sed2)
+
+    # Bundles that do not match their checksums are not imported
+    with tarfile.open(f"{fake_phoenix_grid}/bundle.tar.gz") as tar:
+        tar.extractall(f"{fake_phoenix_grid}/extracted")
+    with open(
+        f"{fake_phoenix_grid}/extracted/phoenix_cube_axes.npz", "ab"
+    ) as f:
+        f.write(b"corrupted")
+    with tarfile.open(f"{fake_phoenix_grid}/bad.tar.gz", "w:gz") as tar:
+        for fname in os.listdir(f"{fake_phoenix_grid}/extracted"):
+            tar.add(f"{fake_phoenix_grid}/extracted/{fname}", arcname=fname)
+    with pytest.raises(ValueError, match="failed checksum"):
+        bundle.import_phoenix_bundle(f"{fake_phoenix_grid}/bad.tar.gz")
+
+    # Manifests can only move files that are in the bundle
+    manifest_path = f"{fake_phoenix_grid}/extracted/{bundle.BUNDLE_MANIFEST}"
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    for fname in ["../phoenix_cube_flux.npy", "missing.npy"]:
+        with open(manifest_path, "w") as f:
+            json.dump(
+                {fname: manifest["phoenix_cube_flux.npy"], **manifest}, f
+            )
+        with tarfile.open(f"{fake_phoenix_grid}/bad.tar.gz", "w:gz") as tar:
+            tar.add(manifest_path, arcname=bundle.BUNDLE_MANIFEST)
+        with pytest.raises(ValueError, match="in manifest"):
+            bundle.import_phoenix_bundle(f"{fake_phoenix_grid}/bad.tar.gz")
@@ -15,6 +15,39 @@ def test_photon_energy():
     assert np.isclose(
         utils.photon_energy(0.21 * u.m).value, 9.41e-25, atol=1e-25
     )
+    # Plain floats in microns give erg per photon without units
+    energy = utils.photon_energy(np.asarray([0.5, 1.0, 2.1e5]))
+    assert isinstance(energy, np.ndarray)
+    assert np.isclose(energy[2], 9.41e-18, atol=1e-18)
+    assert np.allclose(
+        energy[:2],
+        utils.photon_energy([0.5, 1.0] * u.micron).to_value(u.erg / u.photon),
+    )
+    assert np.isclose(
+        utils.photon_energy(0.21, wavelength_unit="m", energy_unit="J"),
+        9.41e-25,
+        atol=1e-25,
+    )
+    return
+
+
+def test_wavelength_to_rgb():
+    assert np.allclose(utils.wavelength_to_rgb(300), 0)
+    assert np.allclose(
+        utils.wavelength_to_rgb(460), [0, 0.4765625, 0.99609375]
+    )
+    assert np.allclose(
+        utils.wavelength_to_rgb(600), [0.99609375, 0.7421875, 0]
+    )
+    wavelength = np.linspace(350, 800, 1000)
+    rgb = utils.wavelength_to_rgb(wavelength)
+    assert rgb.shape == (1000, 3)
+    assert np.all((rgb >= 0) & (rgb < 1))
+    assert np.allclose(rgb[500], utils.wavelength_to_rgb(wavelength[500]))
+    assert np.allclose(
+        utils.wavelength_to_rgb(wavelength * u.nm),
+        utils.wavelength_to_rgb(wavelength),
+    )
     return
 
 